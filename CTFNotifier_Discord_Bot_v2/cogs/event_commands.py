@@ -3,24 +3,30 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
+import io
 import logging
-from datetime import datetime, timedelta
-from typing import Optional, List
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List, Tuple
 import pytz
 import re
+import time
 
 from utils import database, ctftime_api, helpers
 
+logger = logging.getLogger(__name__)
+_view_logger = logging.getLogger(f"{__name__}.ClearConfirmationView")
+
 # --- Constants & Configuration ---
 CYBER_THEME_COLOR = 0x00FFFF  # Cyan/Aqua
-CTFTIME_EVENT_URL_REGEX = r"https?://ctftime.org/event/(\d+)"
+CTFTIME_EVENT_URL_REGEX = re.compile(r"https?://ctftime\.org/event/(\d+)")
+USER_MENTION_REGEX = re.compile(r"<@!?(\d+)>")
+AGENDA_PAGE_SIZE = 10
 
 
 class EventCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.logger = logging.getLogger(f"{__name__}")
-        self.logger.info("EventCommands Cog initialized.")
+        logger.info("EventCommands Cog initialized.")
 
     async def create_team_thread(
         self,
@@ -78,15 +84,16 @@ class EventCommands(commands.Cog):
                     if member:
                         await thread.add_user(member)
                 except (discord.NotFound, discord.Forbidden):
-                    self.logger.warning(f"Could not add user {tid} to thread for {event_name}")
+                    logger.warning("Could not add user %s to thread for %s", tid, event_name)
 
             # Send welcome message with CTF info
             start = event_data.get("start") or event_data.get("start_time")
             finish = event_data.get("finish") or event_data.get("end_time")
-            if isinstance(start, str):
-                start = datetime.fromisoformat(start)
-            if isinstance(finish, str):
-                finish = datetime.fromisoformat(finish)
+            # Database rows store unix epoch seconds
+            if isinstance(start, int):
+                start = datetime.fromtimestamp(start, tz=timezone.utc)
+            if isinstance(finish, int):
+                finish = datetime.fromtimestamp(finish, tz=timezone.utc)
 
             welcome_embed = discord.Embed(
                 title=f"🛡️ {event_data.get('title', event_name)}",
@@ -143,14 +150,14 @@ class EventCommands(commands.Cog):
             welcome_embed.set_footer(text="Good luck! Use /writeup to add writeups after the CTF.")
             await thread.send(embed=welcome_embed)
 
-            self.logger.info(f"Created team thread for {event_name} with {len(teammate_ids)} teammates")
+            logger.info("Created team thread for %s with %s teammates", event_name, len(teammate_ids))
             return thread
 
         except discord.Forbidden:
-            self.logger.warning(f"Cannot create thread in channel {channel.id} (no permission)")
+            logger.warning("Cannot create thread in channel %s (no permission)", channel.id)
             return None
         except Exception as e:
-            self.logger.error(f"Error creating team thread: {e}", exc_info=True)
+            logger.error("Error creating team thread: %s", e, exc_info=True)
             return None
 
     # --- Slash Command: Add Event from CTFtime ---
@@ -170,7 +177,7 @@ class EventCommands(commands.Cog):
     ):
         await interaction.response.defer(ephemeral=True)
 
-        match = re.match(CTFTIME_EVENT_URL_REGEX, ctftime_url)
+        match = CTFTIME_EVENT_URL_REGEX.match(ctftime_url)
         if not match:
             await interaction.followup.send(
                 "Invalid CTFtime event URL format. Please use a URL like `https://ctftime.org/event/1234`.",
@@ -179,7 +186,7 @@ class EventCommands(commands.Cog):
             return
 
         event_id = int(match.group(1))
-        self.logger.info(f"User {interaction.user.id} attempting to add event ID: {event_id}")
+        logger.info("User %s attempting to add event ID: %s", interaction.user.id, event_id)
 
         event_data = await ctftime_api.fetch_event_details(event_id)
 
@@ -190,10 +197,8 @@ class EventCommands(commands.Cog):
             )
             return
 
-        # Check if event has already finished
-        now_utc = datetime.now(pytz.utc)
-        finish_time_utc = event_data["finish"].astimezone(pytz.utc)
-        if finish_time_utc < now_utc:
+        # Check if event has already finished (ctftime_api returns UTC datetimes)
+        if event_data["finish"] < datetime.now(timezone.utc):
             await interaction.followup.send(
                 "This event has already finished and cannot be added.", ephemeral=True
             )
@@ -224,8 +229,7 @@ class EventCommands(commands.Cog):
         added_teammates = []
         if teammates and event:
             # Extract user mentions from the string
-            mention_pattern = r"<@!?(\d+)>"
-            mentioned_ids = re.findall(mention_pattern, teammates)
+            mentioned_ids = USER_MENTION_REGEX.findall(teammates)
 
             for user_id_str in mentioned_ids:
                 member_id = int(user_id_str)
@@ -243,9 +247,8 @@ class EventCommands(commands.Cog):
             color=CYBER_THEME_COLOR,
         )
 
-        # Get user settings for timezone
-        user_settings = await database.get_user_settings(interaction.user.id)
-        user_tz = pytz.timezone(user_settings.get("timezone", "Europe/Paris"))
+        # Make sure the user has a settings row (notification preferences default to on)
+        await database.get_user_settings(interaction.user.id)
 
         embed.add_field(
             name="Start Time",
@@ -313,8 +316,9 @@ class EventCommands(commands.Cog):
             except (discord.Forbidden, discord.NotFound):
                 pass
 
-        self.logger.info(
-            f"Successfully added event {event_data['event_name']} for user {interaction.user.id} with {len(added_teammates)} teammates"
+        logger.info(
+            "Successfully added event %s for user %s with %s teammates",
+            event_data["event_name"], interaction.user.id, len(added_teammates),
         )
 
     # --- Slash Command: Add Custom Event ---
@@ -350,8 +354,8 @@ class EventCommands(commands.Cog):
 
         # Parse dates
         try:
-            start_dt = datetime.strptime(f"{start_date} {start_time}", "%Y-%m-%d %H:%M")
-            end_dt = datetime.strptime(f"{end_date} {end_time}", "%Y-%m-%d %H:%M")
+            start_dt = datetime.strptime(f"{start_date} {start_time}", helpers.DATETIME_INPUT_FORMAT)
+            end_dt = datetime.strptime(f"{end_date} {end_time}", helpers.DATETIME_INPUT_FORMAT)
         except ValueError:
             await interaction.followup.send(
                 "Invalid date/time format. Use YYYY-MM-DD for dates and HH:MM for times.",
@@ -363,8 +367,8 @@ class EventCommands(commands.Cog):
         user_settings = await database.get_user_settings(interaction.user.id)
         user_tz = pytz.timezone(user_settings.get("timezone", "Europe/Paris"))
 
-        start_dt = user_tz.localize(start_dt).astimezone(pytz.utc)
-        end_dt = user_tz.localize(end_dt).astimezone(pytz.utc)
+        start_dt = user_tz.localize(start_dt).astimezone(timezone.utc)
+        end_dt = user_tz.localize(end_dt).astimezone(timezone.utc)
 
         # Validate times
         if end_dt <= start_dt:
@@ -373,7 +377,7 @@ class EventCommands(commands.Cog):
             )
             return
 
-        if end_dt < datetime.now(pytz.utc):
+        if end_dt < datetime.now(timezone.utc):
             await interaction.followup.send(
                 "Cannot add an event that has already ended.", ephemeral=True
             )
@@ -414,8 +418,7 @@ class EventCommands(commands.Cog):
         added_teammates = []
 
         if teammates and event:
-            mention_pattern = r"<@!?(\d+)>"
-            mentioned_ids = re.findall(mention_pattern, teammates)
+            mentioned_ids = USER_MENTION_REGEX.findall(teammates)
 
             for user_id_str in mentioned_ids:
                 member_id = int(user_id_str)
@@ -464,7 +467,7 @@ class EventCommands(commands.Cog):
         embed.set_footer(text="Custom event • Use /agenda to view your events")
         await interaction.followup.send(embed=embed, ephemeral=True)
 
-        self.logger.info(f"User {interaction.user.id} created custom event: {event_name}")
+        logger.info("User %s created custom event: %s", interaction.user.id, event_name)
 
     # --- Slash Command: View Agenda ---
     @app_commands.command(
@@ -479,69 +482,26 @@ class EventCommands(commands.Cog):
         show_past: bool = False
     ):
         await interaction.response.defer(ephemeral=True)
-        self.logger.info(f"User {interaction.user.id} requested their agenda.")
+        logger.info("User %s requested their agenda.", interaction.user.id)
 
-        user_events = await database.get_user_events(interaction.user.id, include_past=show_past)
+        total = await database.count_user_events(interaction.user.id, include_past=show_past)
 
-        if not user_events:
+        if not total:
             await interaction.followup.send(
                 "Your agenda is empty. Use `/add` or `/add_custom` to add events!",
                 ephemeral=True
             )
             return
 
-        # Get user settings
-        user_settings = await database.get_user_settings(interaction.user.id)
-
-        embed = discord.Embed(
-            title=f"📅 {interaction.user.display_name}'s CTF Agenda",
-            description=f"{'All' if show_past else 'Upcoming'} CTF events ({len(user_events)} total):",
-            color=CYBER_THEME_COLOR,
+        first_page = await database.get_user_events_page(
+            interaction.user.id, include_past=show_past, limit=AGENDA_PAGE_SIZE
         )
+        view = AgendaPaginationView(interaction.user, show_past, total, first_page)
 
-        now = datetime.now(pytz.utc)
-
-        for event in user_events[:25]:  # Discord embed field limit
-            start_dt = event["start_time"]
-            end_dt = event["end_time"]
-            if isinstance(start_dt, str):
-                start_dt = datetime.fromisoformat(start_dt)
-            if isinstance(end_dt, str):
-                end_dt = datetime.fromisoformat(end_dt)
-
-            # Make timezone aware if needed
-            if start_dt.tzinfo is None:
-                start_dt = pytz.utc.localize(start_dt)
-            if end_dt.tzinfo is None:
-                end_dt = pytz.utc.localize(end_dt)
-
-            # Determine status
-            if end_dt < now:
-                status = "🏁 Finished"
-            elif start_dt <= now <= end_dt:
-                status = "🔴 LIVE NOW"
-            else:
-                status = "⏳ Upcoming"
-
-            # Check if custom event
-            is_custom = event.get("is_custom", 0)
-            icon = "🎯" if is_custom else "🛡️"
-
-            embed.add_field(
-                name=f"{icon} {event['event_name']} [{status}]",
-                value=(
-                    f"**Start:** {helpers.format_discord_timestamp(start_dt)}\n"
-                    f"**End:** {helpers.format_discord_timestamp(end_dt)}"
-                ),
-                inline=False,
-            )
-
-        if len(user_events) > 25:
-            embed.set_footer(text=f"Showing 25 of {len(user_events)} events • Use /search to filter")
+        if view.pages > 1:
+            await interaction.followup.send(embed=view.build_embed(), view=view, ephemeral=True)
         else:
-            embed.set_footer(text="Use /details <event_name> for more info • /calendar to export")
-
-        await interaction.followup.send(embed=embed, ephemeral=True)
+            await interaction.followup.send(embed=view.build_embed(), ephemeral=True)
 
     # --- Slash Command: Event Details ---
     @app_commands.command(
@@ -553,7 +513,7 @@ class EventCommands(commands.Cog):
     )
     async def event_details(self, interaction: discord.Interaction, event_name: str):
         await interaction.response.defer(ephemeral=True)
-        self.logger.info(f"User {interaction.user.id} requested details for event: {event_name}")
+        logger.info("User %s requested details for event: %s", interaction.user.id, event_name)
 
         event = await database.get_event_details(interaction.user.id, event_name)
 
@@ -570,22 +530,14 @@ class EventCommands(commands.Cog):
             color=CYBER_THEME_COLOR,
         )
 
-        # Parse times
-        start_dt = event["start_time"]
-        end_dt = event["end_time"]
-        if isinstance(start_dt, str):
-            start_dt = datetime.fromisoformat(start_dt)
-        if isinstance(end_dt, str):
-            end_dt = datetime.fromisoformat(end_dt)
-
         embed.add_field(
             name="Start Time",
-            value=helpers.format_discord_timestamp(start_dt),
+            value=helpers.format_discord_timestamp_from_epoch(event["start_time"]),
             inline=True,
         )
         embed.add_field(
             name="End Time",
-            value=helpers.format_discord_timestamp(end_dt),
+            value=helpers.format_discord_timestamp_from_epoch(event["end_time"]),
             inline=True,
         )
         embed.add_field(name="Format", value=event.get("format") or "N/A", inline=True)
@@ -634,17 +586,11 @@ class EventCommands(commands.Cog):
     async def event_autocomplete(
         self, interaction: discord.Interaction, current: str
     ) -> list[app_commands.Choice[str]]:
-        user_events = await database.get_user_events(interaction.user.id, include_past=True)
-        choices = []
-        for event in user_events:
-            if current.lower() in event["event_name"].lower():
-                display_name = event["event_name"][:99]
-                choices.append(
-                    app_commands.Choice(name=display_name, value=event["event_name"])
-                )
-            if len(choices) >= 25:
-                break
-        return choices
+        event_names = await database.search_user_event_names(interaction.user.id, current)
+        return [
+            app_commands.Choice(name=name[:99], value=name)
+            for name in event_names
+        ]
 
     @event_details.autocomplete("event_name")
     async def details_autocomplete(
@@ -729,10 +675,6 @@ class EventCommands(commands.Cog):
 
             # Notify the teammate via DM
             try:
-                start_dt = event["start_time"]
-                if isinstance(start_dt, str):
-                    start_dt = datetime.fromisoformat(start_dt)
-
                 dm_embed = discord.Embed(
                     title="📅 You've been added to a CTF!",
                     description=f"**{interaction.user.display_name}** added you to **{event_name}**",
@@ -740,7 +682,7 @@ class EventCommands(commands.Cog):
                 )
                 dm_embed.add_field(
                     name="Start Time",
-                    value=helpers.format_discord_timestamp(start_dt),
+                    value=helpers.format_discord_timestamp_from_epoch(event["start_time"]),
                     inline=True,
                 )
                 await member.send(embed=dm_embed)
@@ -834,7 +776,7 @@ class EventCommands(commands.Cog):
     @app_commands.autocomplete(event_name=event_autocomplete)
     async def remove_event(self, interaction: discord.Interaction, event_name: str):
         await interaction.response.defer(ephemeral=True)
-        self.logger.info(f"User {interaction.user.id} attempting to remove event: {event_name}")
+        logger.info("User %s attempting to remove event: %s", interaction.user.id, event_name)
 
         success = await database.remove_event_from_user(interaction.user.id, event_name)
 
@@ -843,7 +785,7 @@ class EventCommands(commands.Cog):
                 f"🗑️ Event `{event_name}` removed from your agenda.",
                 ephemeral=True
             )
-            self.logger.info(f"Successfully removed event {event_name} for user {interaction.user.id}")
+            logger.info("Successfully removed event %s for user %s", event_name, interaction.user.id)
         else:
             await interaction.followup.send(
                 f"Event `{event_name}` not found in your agenda.",
@@ -862,7 +804,7 @@ class EventCommands(commands.Cog):
             color=0xFFCC00,
         )
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
-        self.logger.info(f"User {interaction.user.id} initiated clear agenda confirmation.")
+        logger.info("User %s initiated clear agenda confirmation.", interaction.user.id)
 
     # --- Slash Command: Search Events ---
     @app_commands.command(
@@ -888,14 +830,11 @@ class EventCommands(commands.Cog):
             color=CYBER_THEME_COLOR,
         )
 
+        fmt = helpers.format_discord_timestamp_from_epoch
         for event in results[:10]:
-            start_dt = event["start_time"]
-            if isinstance(start_dt, str):
-                start_dt = datetime.fromisoformat(start_dt)
-
             embed.add_field(
                 name=f"🛡️ {event['event_name']}",
-                value=f"**Start:** {helpers.format_discord_timestamp(start_dt)}",
+                value=f"**Start:** {fmt(event['start_time'])}",
                 inline=False,
             )
 
@@ -941,7 +880,7 @@ class EventCommands(commands.Cog):
 
         # Create file
         file = discord.File(
-            fp=__import__('io').BytesIO(ical_content.encode('utf-8')),
+            fp=io.BytesIO(ical_content.encode('utf-8')),
             filename=filename
         )
 
@@ -972,7 +911,6 @@ class ClearConfirmationView(discord.ui.View):
     def __init__(self, author: discord.User, timeout=60.0):
         super().__init__(timeout=timeout)
         self.author = author
-        self.logger = logging.getLogger(f"{__name__}.ClearConfirmationView")
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if interaction.user.id != self.author.id:
@@ -985,7 +923,7 @@ class ClearConfirmationView(discord.ui.View):
     async def on_timeout(self):
         for item in self.children:
             item.disabled = True
-        self.logger.info(f"Clear confirmation timed out for user {self.author.id}")
+        _view_logger.info("Clear confirmation timed out for user %s", self.author.id)
 
     @discord.ui.button(
         label="Yes, Clear All",
@@ -1001,7 +939,7 @@ class ClearConfirmationView(discord.ui.View):
             embed=None,
             view=None,
         )
-        self.logger.info(f"User {interaction.user.id} cleared {deleted_count} events.")
+        _view_logger.info("User %s cleared %s events.", interaction.user.id, deleted_count)
         self.stop()
 
     @discord.ui.button(
@@ -1015,10 +953,116 @@ class ClearConfirmationView(discord.ui.View):
         await interaction.response.edit_message(
             content="❌ Agenda clearing cancelled.", embed=None, view=None
         )
-        self.logger.info(f"User {interaction.user.id} cancelled clearing agenda.")
+        _view_logger.info("User %s cancelled clearing agenda.", interaction.user.id)
         self.stop()
 
 
+# --- Pagination View for Agenda ---
+class AgendaPaginationView(discord.ui.View):
+    def __init__(
+        self,
+        author: discord.User,
+        include_past: bool,
+        total: int,
+        first_page: List[dict],
+        timeout=180.0,
+    ):
+        super().__init__(timeout=timeout)
+        self.author = author
+        self.include_past = include_past
+        self.total = total
+        self.pages = max(1, -(-total // AGENDA_PAGE_SIZE))
+        self.page = 0
+        self.events = first_page
+        # Keyset cursor (start_time, id) that produced each visited page; None = first page
+        self._cursors: List[Optional[Tuple[int, int]]] = [None]
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.previous_button.disabled = self.page == 0
+        self.next_button.disabled = self.page + 1 >= self.pages or not self.events
+
+    def build_embed(self) -> discord.Embed:
+        embed = discord.Embed(
+            title=f"📅 {self.author.display_name}'s CTF Agenda",
+            description=f"{'All' if self.include_past else 'Upcoming'} CTF events ({self.total} total):",
+            color=CYBER_THEME_COLOR,
+        )
+
+        now = int(time.time())
+        fmt = helpers.format_discord_timestamp_from_epoch
+
+        for event in self.events:
+            start_ts = event["start_time"]
+            end_ts = event["end_time"]
+
+            # Determine status
+            if end_ts < now:
+                status = "🏁 Finished"
+            elif start_ts <= now <= end_ts:
+                status = "🔴 LIVE NOW"
+            else:
+                status = "⏳ Upcoming"
+
+            # Check if custom event
+            is_custom = event.get("is_custom", 0)
+            icon = "🎯" if is_custom else "🛡️"
+
+            embed.add_field(
+                name=f"{icon} {event['event_name']} [{status}]",
+                value=(
+                    f"**Start:** {fmt(start_ts)}\n"
+                    f"**End:** {fmt(end_ts)}"
+                ),
+                inline=False,
+            )
+
+        if self.pages > 1:
+            embed.set_footer(text=f"Page {self.page + 1}/{self.pages} • Use /details <event_name> for more info")
+        else:
+            embed.set_footer(text="Use /details <event_name> for more info • /calendar to export")
+        return embed
+
+    async def _show_page(self, interaction: discord.Interaction):
+        self.events = await database.get_user_events_page(
+            self.author.id,
+            include_past=self.include_past,
+            after=self._cursors[self.page],
+            limit=AGENDA_PAGE_SIZE,
+        )
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.build_embed(), view=self)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.author.id:
+            await interaction.response.send_message(
+                "This agenda is not for you.", ephemeral=True
+            )
+            return False
+        return True
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_button(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        self.page = max(0, self.page - 1)
+        await self._show_page(interaction)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_button(
+        self, interaction: discord.Interaction, button: discord.ui.Button
+    ):
+        last = self.events[-1]
+        self.page += 1
+        del self._cursors[self.page:]
+        self._cursors.append((last["start_time"], last["id"]))
+        await self._show_page(interaction)
+
+
 # --- Setup Function ---
 async def setup(bot: commands.Bot):
     await bot.add_cog(EventCommands(bot))
@@ -4,15 +4,15 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
-from datetime import datetime
 from typing import Optional
-import pytz
 import re
 from textwrap import dedent
 
 from utils import ctftime_api, database, helpers
 
-CTFTIME_EVENT_URL_REGEX = r"https?://ctftime.org/event/(\d+)"
+logger = logging.getLogger(__name__)
+
+CTFTIME_EVENT_URL_REGEX = re.compile(r"https?://ctftime\.org/event/(\d+)")
 
 # --- Constants & Configuration ---
 CYBER_THEME_COLOR = 0x00FFFF  # Cyan/Aqua
@@ -28,8 +28,7 @@ FORMAT_CHOICES = [
 class GeneralCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.logger = logging.getLogger(f"{__name__}")
-        self.logger.info("GeneralCommands Cog initialized.")
+        logger.info("GeneralCommands Cog initialized.")
 
     # --- Slash Command: Upcoming Events ---
     @app_commands.command(
@@ -49,8 +48,9 @@ class GeneralCommands(commands.Cog):
         min_weight: Optional[app_commands.Range[float, 0, 100]] = None
     ):
         await interaction.response.defer(ephemeral=True)
-        self.logger.info(
-            f"User {interaction.user.id} requested {limit} upcoming events (format={format}, min_weight={min_weight})"
+        logger.info(
+            "User %s requested %s upcoming events (format=%s, min_weight=%s)",
+            interaction.user.id, limit, format, min_weight,
         )
 
         upcoming_list = await ctftime_api.fetch_upcoming_events(
@@ -79,6 +79,11 @@ class GeneralCommands(commands.Cog):
             color=CYBER_THEME_COLOR,
         )
 
+        # Bind per-row helpers once; the loop runs for every listed event
+        fmt = helpers.format_discord_timestamp
+        duration_of = helpers.calculate_duration
+        fmt_weight = helpers.format_weight
+
         for event in upcoming_list:
             event_name = event.get("title", "N/A")
             event_weight = event.get("weight", 0)
@@ -91,13 +96,13 @@ class GeneralCommands(commands.Cog):
             # Build field value
             value_lines = []
             if start_dt:
-                value_lines.append(f"**Start:** {helpers.format_discord_timestamp(start_dt, 'R')}")
+                value_lines.append(f"**Start:** {fmt(start_dt, 'R')}")
             if end_dt:
-                duration = helpers.calculate_duration(start_dt, end_dt)
+                duration = duration_of(start_dt, end_dt)
                 value_lines.append(f"**Duration:** {duration}")
 
             value_lines.append(f"**Format:** {event_format}")
-            value_lines.append(f"**Weight:** {helpers.format_weight(event_weight)}")
+            value_lines.append(f"**Weight:** {fmt_weight(event_weight)}")
 
             # Links
             links = []
@@ -216,11 +221,8 @@ class GeneralCommands(commands.Cog):
             color=CYBER_THEME_COLOR,
         )
 
+        fmt = helpers.format_discord_timestamp_from_epoch
         for event in past_events:
-            end_dt = event["end_time"]
-            if isinstance(end_dt, str):
-                end_dt = datetime.fromisoformat(end_dt)
-
             # Get writeups count for this event
             writeups = await database.get_event_writeups(event["id"])
             writeup_text = f" | 📝 {len(writeups)} writeup(s)" if writeups else ""
@@ -228,7 +230,7 @@ class GeneralCommands(commands.Cog):
             embed.add_field(
                 name=f"🛡️ {event['event_name']}",
                 value=(
-                    f"**Ended:** {helpers.format_discord_timestamp(end_dt, 'R')}\n"
+                    f"**Ended:** {fmt(event['end_time'], 'R')}\n"
                     f"**Format:** {event.get('format', 'N/A')}{writeup_text}"
                 ),
                 inline=False
@@ -245,7 +247,7 @@ class GeneralCommands(commands.Cog):
     @app_commands.describe(query="The name of the CTF to search for")
     async def ctf_info(self, interaction: discord.Interaction, query: str):
         await interaction.response.defer(ephemeral=True)
-        self.logger.info(f"User {interaction.user.id} searched for: {query}")
+        logger.info("User %s searched for: %s", interaction.user.id, query)
 
         # Search upcoming events
         results = await ctftime_api.search_events(query, limit=5)
@@ -265,6 +267,10 @@ class GeneralCommands(commands.Cog):
             color=CYBER_THEME_COLOR,
         )
 
+        fmt = helpers.format_discord_timestamp
+        duration_of = helpers.calculate_duration
+        fmt_weight = helpers.format_weight
+
         for event in results:
             start_dt = event.get("start_dt")
             finish_dt = event.get("finish_dt")
@@ -274,11 +280,11 @@ class GeneralCommands(commands.Cog):
 
             value_lines = []
             if start_dt:
-                value_lines.append(f"**Start:** {helpers.format_discord_timestamp(start_dt, 'R')}")
+                value_lines.append(f"**Start:** {fmt(start_dt, 'R')}")
             if finish_dt and start_dt:
-                duration = helpers.calculate_duration(start_dt, finish_dt)
+                duration = duration_of(start_dt, finish_dt)
                 value_lines.append(f"**Duration:** {duration}")
-            value_lines.append(f"**Format:** {event_format} | **Weight:** {helpers.format_weight(weight)}")
+            value_lines.append(f"**Format:** {event_format} | **Weight:** {fmt_weight(weight)}")
             if ctftime_url:
                 value_lines.append(f"[View on CTFtime]({ctftime_url}) | Use `/ctf_details` for full info")
 
@@ -301,10 +307,10 @@ class GeneralCommands(commands.Cog):
     )
     async def ctf_details(self, interaction: discord.Interaction, ctftime_url: str):
         await interaction.response.defer(ephemeral=True)
-        self.logger.info(f"User {interaction.user.id} requested CTF details for: {ctftime_url}")
+        logger.info("User %s requested CTF details for: %s", interaction.user.id, ctftime_url)
 
         # Try to extract event ID from URL or plain number
-        match = re.match(CTFTIME_EVENT_URL_REGEX, ctftime_url)
+        match = CTFTIME_EVENT_URL_REGEX.match(ctftime_url)
         if match:
             event_id = int(match.group(1))
         elif ctftime_url.strip().isdigit():
@@ -3,30 +3,126 @@
 import discord
 from discord.ext import commands, tasks
 import logging
-from datetime import datetime, timedelta
-import pytz
+from typing import Dict, Optional, Tuple
 import asyncio
+import time
 
 from utils import database, helpers
 
+logger = logging.getLogger(__name__)
+
 # --- Constants & Configuration ---
 CYBER_THEME_COLOR = 0x00FFFF  # Cyan/Aqua - consistent with other cogs
 NOTIFICATION_CHECK_INTERVAL_SECONDS = 30  # Check every 30 seconds
 CLEANUP_INTERVAL_HOURS = 24  # Clean up old events every 24 hours
+USER_CACHE_TTL_SECONDS = 3600  # How long fetched (or missing) users are remembered
+DM_SEND_CONCURRENCY = 10  # DMs in flight at once; discord.py still enforces the REST rate limits
+ERROR_BACKOFF_THRESHOLD = 3  # Consecutive failed passes before the check interval starts backing off
+MAX_BACKOFF_SECONDS = 300  # Upper bound for the backed-off check interval
+
+# Notification embeds: (title, description, color, attach event link).
+# Placeholders: {name}, {start_r}, {start_f}, {end_r}, {end_f}
+NOTIFICATION_EMBEDS = {
+    "channel_reminder": (
+        "🚨 CTF Starting Soon: {name}",
+        "This event starts in about **1 hour**!\n\n**Start:** {start_r} ({start_f})",
+        0xFFCC00,  # Warning Yellow
+        True,
+    ),
+    "reminder": (
+        "🚨 CTF Reminder: {name}",
+        "This event starts in about 1 hour!\n\n**Start:** {start_r} ({start_f})",
+        0xFFCC00,
+        True,
+    ),
+    "team_reminder": (
+        "🚨 CTF Reminder: {name}",
+        "A CTF you're participating in starts in about 1 hour!\n\n**Start:** {start_r}",
+        0xFFCC00,
+        True,
+    ),
+    "good_luck": (
+        "🍀 Good Luck: {name}",
+        "The CTF has just started! Good luck!\n\n**Ends:** {end_f} ({end_r})",
+        0x00FF00,  # Green
+        True,
+    ),
+    "ending_soon": (
+        "⏰ Ending Soon: {name}",
+        "This CTF ends in about 1 hour! Submit your flags!\n\n**Ends:** {end_r} ({end_f})",
+        0xFFA500,  # Orange
+        True,
+    ),
+    "congratulations": (
+        "🎉 CTF Finished: {name}",
+        "This CTF has ended. Great job!\n\nDon't forget to add your writeups with `/writeup`!",
+        CYBER_THEME_COLOR,
+        False,
+    ),
+}
 
 
 class NotificationService(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.logger = logging.getLogger(f"{__name__}")
+        # user_id -> (user or None if the account no longer exists, monotonic fetch time)
+        self._user_cache: Dict[int, Tuple[Optional[discord.User], float]] = {}
+        # Idle-tick skipping: nothing can become due before _next_check_at unless the
+        # database's notification schedule version moves past _schedule_version
+        self._next_check_at: Optional[float] = None
+        self._schedule_version = -1
+        self._dm_semaphore = asyncio.Semaphore(DM_SEND_CONCURRENCY)
+        self._consecutive_errors = 0
         self.check_events_loop.start()
         self.cleanup_old_events_loop.start()
-        self.logger.info("NotificationService Cog initialized and loops started.")
+        logger.info("NotificationService Cog initialized and loops started.")
 
     def cog_unload(self):
         self.check_events_loop.cancel()
         self.cleanup_old_events_loop.cancel()
-        self.logger.info("NotificationService loops cancelled.")
+        logger.info("NotificationService loops cancelled.")
+
+    @staticmethod
+    def _make_embed(kind: str, event: dict) -> discord.Embed:
+        """Builds the notification embed of the given kind for an event row."""
+        title, description, color, with_link = NOTIFICATION_EMBEDS[kind]
+        fmt = helpers.format_discord_timestamp_from_epoch
+        # Times are stored as unix epoch seconds and rendered as-is
+        start_ts = event["start_time"]
+        end_ts = event["end_time"]
+        values = {
+            "name": event["event_name"],
+            "start_r": fmt(start_ts, "R"),
+            "start_f": fmt(start_ts, "F"),
+            "end_r": fmt(end_ts, "R"),
+            "end_f": fmt(end_ts, "F"),
+        }
+        embed = discord.Embed(
+            title=title.format(**values),
+            description=description.format(**values),
+            color=color,
+        )
+        ctftime_url = event.get("ctftime_url")
+        if with_link and ctftime_url:
+            embed.add_field(name="Event Link", value=ctftime_url, inline=False)
+        return embed
+
+    async def _resolve_user(self, user_id: int) -> Optional[discord.User]:
+        """Returns the user from the client cache, or fetches it at most once per TTL."""
+        user = self.bot.get_user(user_id)
+        if user:
+            return user
+
+        cached = self._user_cache.get(user_id)
+        if cached and time.monotonic() - cached[1] < USER_CACHE_TTL_SECONDS:
+            return cached[0]
+
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            user = None
+        self._user_cache[user_id] = (user, time.monotonic())
+        return user
 
     async def send_dm_notification(
         self,
@@ -37,24 +133,36 @@ class NotificationService(commands.Cog):
     ) -> bool:
         """Send a DM notification to a user. Returns True if successful."""
         try:
-            user = self.bot.get_user(user_id)
+            user = await self._resolve_user(user_id)
             if not user:
-                user = await self.bot.fetch_user(user_id)
+                logger.warning("User %s not found", user_id)
+                return False
 
             await user.send(embed=embed)
-            self.logger.info(f"Sent {notification_type} DM for '{event_name}' to user {user_id}")
+            logger.info("Sent %s DM for '%s' to user %s", notification_type, event_name, user_id)
             return True
 
         except discord.Forbidden:
-            self.logger.warning(f"Cannot send DM to user {user_id} (DMs disabled)")
+            logger.warning("Cannot send DM to user %s (DMs disabled)", user_id)
             return False
         except discord.NotFound:
-            self.logger.warning(f"User {user_id} not found")
+            logger.warning("User %s not found", user_id)
             return False
         except Exception as e:
-            self.logger.error(f"Error sending DM to {user_id}: {e}", exc_info=True)
+            logger.error("Error sending DM to %s: %s", user_id, e, exc_info=True)
             return False
 
+    async def _send_dm_bounded(
+        self,
+        user_id: int,
+        embed: discord.Embed,
+        event_name: str,
+        notification_type: str
+    ) -> bool:
+        """Send a DM notification, with at most DM_SEND_CONCURRENCY sends in flight."""
+        async with self._dm_semaphore:
+            return await self.send_dm_notification(user_id, embed, event_name, notification_type)
+
     async def send_channel_notification(
         self,
         server_id: int,
@@ -80,17 +188,17 @@ class NotificationService(commands.Cog):
                 mention_str = " ".join([f"<@{uid}>" for uid in user_mentions])
 
             await channel.send(content=mention_str if mention_str else None, embed=embed)
-            self.logger.info(f"Sent channel notification for '{event_name}' to channel {channel_id}")
+            logger.info("Sent channel notification for '%s' to channel %s", event_name, channel_id)
             return True
 
         except discord.Forbidden:
-            self.logger.warning(f"Cannot send to channel in server {server_id} (no permission)")
+            logger.warning("Cannot send to channel in server %s (no permission)", server_id)
             return False
         except discord.NotFound:
-            self.logger.warning(f"Channel not found for server {server_id}")
+            logger.warning("Channel not found for server %s", server_id)
             return False
         except Exception as e:
-            self.logger.error(f"Error sending channel notification: {e}", exc_info=True)
+            logger.error("Error sending channel notification: %s", e, exc_info=True)
             return False
 
     @tasks.loop(seconds=NOTIFICATION_CHECK_INTERVAL_SECONDS)
@@ -98,236 +206,170 @@ class NotificationService(commands.Cog):
         """Main loop that checks for events and sends notifications."""
         await self.bot.wait_until_ready()
 
+        # Flags set during this pass, written in one transaction at the end
+        sent_flags = []
+        # DMs are queued while walking the rows and sent concurrently afterwards; their flags
+        # are only recorded once the sends have been attempted
+        dm_queue = []
+        dm_flags = []
+
         try:
-            all_events = await database.get_all_events_for_notifications()
-            now_utc = datetime.now(pytz.utc)
+            now = int(time.time())
+            schedule_version = database.get_notification_schedule_version()
+            if (
+                schedule_version == self._schedule_version
+                and self._next_check_at is not None
+                and now < self._next_check_at
+            ):
+                return
+            self._schedule_version = schedule_version
+
+            # Window and preference checks happen in SQL; only rows with something due come back
+            due_events = await database.get_due_notifications(now)
+
+            if due_events:
+                # Windows are still open; look again on the next tick
+                self._next_check_at = None
+            else:
+                next_at = await database.get_next_notification_time(now)
+                self._next_check_at = next_at if next_at is not None else float("inf")
 
             # Group events by event_id for channel notifications
             processed_channel_notifications = set()
 
-            for event in all_events:
+            for event in due_events:
                 user_id = event["user_id"]
                 event_name = event["event_name"]
                 event_id = event["id"]
                 server_id = event.get("server_id")
 
-                # Parse times
-                start_time = event["start_time"]
-                end_time = event["end_time"]
-                if isinstance(start_time, str):
-                    start_time = datetime.fromisoformat(start_time)
-                if isinstance(end_time, str):
-                    end_time = datetime.fromisoformat(end_time)
-
-                # Ensure timezone awareness
-                if start_time.tzinfo is None:
-                    start_time = pytz.utc.localize(start_time)
-                else:
-                    start_time = start_time.astimezone(pytz.utc)
-
-                if end_time.tzinfo is None:
-                    end_time = pytz.utc.localize(end_time)
-                else:
-                    end_time = end_time.astimezone(pytz.utc)
-
-                # Get user notification preferences (with defaults)
-                pref_reminder = event.get("reminder_1h_before", 1)
-                pref_good_luck = event.get("good_luck_on_start", 1)
-                pref_ending_soon = event.get("ending_soon_1h", 1)
-                pref_congrats = event.get("congratulations_on_end", 1)
-                pref_channel = event.get("channel_notification", 1)
-
                 # Get event members for team notifications
                 event_members = await database.get_event_members(event_id, user_id)
                 all_participants = [user_id] + event_members
 
-                ctftime_url = event.get("ctftime_url", "N/A")
-
                 # =========================================
                 # 1. Channel Notification (1h before start)
                 # =========================================
                 channel_key = f"{event_id}_{server_id}_channel"
-                channel_reminder_sent = bool(event.get("channel_reminder_sent", 0))
-                reminder_time = start_time - timedelta(hours=1)
-
-                if (
-                    server_id
-                    and pref_channel
-                    and not channel_reminder_sent
-                    and channel_key not in processed_channel_notifications
-                    and reminder_time <= now_utc < reminder_time + timedelta(minutes=5)
-                ):
-                    embed = discord.Embed(
-                        title=f"🚨 CTF Starting Soon: {event_name}",
-                        description=(
-                            f"This event starts in about **1 hour**!\n\n"
-                            f"**Start:** {helpers.format_discord_timestamp(start_time, style='R')} "
-                            f"({helpers.format_discord_timestamp(start_time, style='F')})"
-                        ),
-                        color=0xFFCC00,  # Warning Yellow
-                    )
-                    if ctftime_url != "N/A":
-                        embed.add_field(name="Event Link", value=ctftime_url, inline=False)
 
+                if event["due_channel_reminder"] and channel_key not in processed_channel_notifications:
+                    embed = self._make_embed("channel_reminder", event)
                     success = await self.send_channel_notification(
                         server_id, embed, event_name, all_participants
                     )
                     if success:
                         # Mark as sent for all users with this event
-                        await database.update_notification_flag(
-                            user_id, event_name, "channel_reminder_sent", True
-                        )
+                        sent_flags.append((user_id, event_id, database.FLAG_CHANNEL_REMINDER))
                         processed_channel_notifications.add(channel_key)
 
                 # =========================================
                 # 2. DM: 1 Hour Reminder (Before Start)
                 # =========================================
-                reminder_flag = bool(event.get("reminder_sent", 0))
-                if (
-                    pref_reminder
-                    and not reminder_flag
-                    and reminder_time <= now_utc < reminder_time + timedelta(minutes=5)
-                ):
-                    embed = discord.Embed(
-                        title=f"🚨 CTF Reminder: {event_name}",
-                        description=(
-                            f"This event starts in about 1 hour!\n\n"
-                            f"**Start:** {helpers.format_discord_timestamp(start_time, style='R')} "
-                            f"({helpers.format_discord_timestamp(start_time, style='F')})"
-                        ),
-                        color=0xFFCC00,
-                    )
-                    if ctftime_url != "N/A":
-                        embed.add_field(name="Event Link", value=ctftime_url, inline=False)
+                if event["due_reminder"]:
+                    embed = self._make_embed("reminder", event)
 
                     # Send to event owner
-                    await self.send_dm_notification(user_id, embed, event_name, "reminder")
-                    await database.update_notification_flag(user_id, event_name, "reminder_sent", True)
+                    dm_queue.append((user_id, embed, event_name, "reminder"))
+                    dm_flags.append((user_id, event_id, database.FLAG_REMINDER))
 
-                    # Send to team members
+                    # Send to team members (one embed shared by all of them)
+                    if event_members:
+                        member_embed = self._make_embed("team_reminder", event)
                     for member_id in event_members:
-                        member_embed = discord.Embed(
-                            title=f"🚨 CTF Reminder: {event_name}",
-                            description=(
-                                f"A CTF you're participating in starts in about 1 hour!\n\n"
-                                f"**Start:** {helpers.format_discord_timestamp(start_time, style='R')}"
-                            ),
-                            color=0xFFCC00,
-                        )
-                        if ctftime_url != "N/A":
-                            member_embed.add_field(name="Event Link", value=ctftime_url, inline=False)
-                        await self.send_dm_notification(member_id, member_embed, event_name, "team_reminder")
+                        dm_queue.append((member_id, member_embed, event_name, "team_reminder"))
 
                 # =========================================
                 # 3. DM: Good Luck Message (At Start)
                 # =========================================
-                good_luck_flag = bool(event.get("good_luck_sent", 0))
-                if (
-                    pref_good_luck
-                    and not good_luck_flag
-                    and start_time <= now_utc < start_time + timedelta(minutes=2)
-                ):
-                    embed = discord.Embed(
-                        title=f"🍀 Good Luck: {event_name}",
-                        description=(
-                            f"The CTF has just started! Good luck!\n\n"
-                            f"**Ends:** {helpers.format_discord_timestamp(end_time, style='F')} "
-                            f"({helpers.format_discord_timestamp(end_time, style='R')})"
-                        ),
-                        color=0x00FF00,  # Green
-                    )
-                    if ctftime_url != "N/A":
-                        embed.add_field(name="Event Link", value=ctftime_url, inline=False)
+                if event["due_good_luck"]:
+                    embed = self._make_embed("good_luck", event)
 
-                    await self.send_dm_notification(user_id, embed, event_name, "good_luck")
-                    await database.update_notification_flag(user_id, event_name, "good_luck_sent", True)
+                    dm_queue.append((user_id, embed, event_name, "good_luck"))
+                    dm_flags.append((user_id, event_id, database.FLAG_GOOD_LUCK))
 
                     # Send to team members
                     for member_id in event_members:
-                        await self.send_dm_notification(member_id, embed, event_name, "team_good_luck")
+                        dm_queue.append((member_id, embed, event_name, "team_good_luck"))
 
                 # =========================================
                 # 4. DM: Ending Soon Message (1h Before End)
                 # =========================================
-                ending_soon_flag = bool(event.get("ending_soon_sent", 0))
-                ending_soon_time = end_time - timedelta(hours=1)
-                if (
-                    pref_ending_soon
-                    and not ending_soon_flag
-                    and ending_soon_time <= now_utc < ending_soon_time + timedelta(minutes=5)
-                ):
-                    embed = discord.Embed(
-                        title=f"⏰ Ending Soon: {event_name}",
-                        description=(
-                            f"This CTF ends in about 1 hour! Submit your flags!\n\n"
-                            f"**Ends:** {helpers.format_discord_timestamp(end_time, style='R')} "
-                            f"({helpers.format_discord_timestamp(end_time, style='F')})"
-                        ),
-                        color=0xFFA500,  # Orange
-                    )
-                    if ctftime_url != "N/A":
-                        embed.add_field(name="Event Link", value=ctftime_url, inline=False)
+                if event["due_ending_soon"]:
+                    embed = self._make_embed("ending_soon", event)
 
-                    await self.send_dm_notification(user_id, embed, event_name, "ending_soon")
-                    await database.update_notification_flag(user_id, event_name, "ending_soon_sent", True)
+                    dm_queue.append((user_id, embed, event_name, "ending_soon"))
+                    dm_flags.append((user_id, event_id, database.FLAG_ENDING_SOON))
 
                     # Send to team members
                     for member_id in event_members:
-                        await self.send_dm_notification(member_id, embed, event_name, "team_ending_soon")
+                        dm_queue.append((member_id, embed, event_name, "team_ending_soon"))
 
                 # =========================================
                 # 5. DM: Congratulations Message (At End)
                 # =========================================
-                congrats_flag = bool(event.get("congratulations_sent", 0))
-                if (
-                    pref_congrats
-                    and not congrats_flag
-                    and now_utc >= end_time
-                    and now_utc < end_time + timedelta(minutes=10)
-                ):
-                    embed = discord.Embed(
-                        title=f"🎉 CTF Finished: {event_name}",
-                        description=(
-                            f"This CTF has ended. Great job!\n\n"
-                            f"Don't forget to add your writeups with `/writeup`!"
-                        ),
-                        color=CYBER_THEME_COLOR,
-                    )
+                if event["due_congratulations"]:
+                    embed = self._make_embed("congratulations", event)
 
-                    await self.send_dm_notification(user_id, embed, event_name, "congratulations")
-                    await database.update_notification_flag(user_id, event_name, "congratulations_sent", True)
+                    dm_queue.append((user_id, embed, event_name, "congratulations"))
+                    dm_flags.append((user_id, event_id, database.FLAG_CONGRATULATIONS))
 
                     # Send to team members
                     for member_id in event_members:
-                        await self.send_dm_notification(member_id, embed, event_name, "team_congratulations")
+                        dm_queue.append((member_id, embed, event_name, "team_congratulations"))
+
+            if dm_queue:
+                await asyncio.gather(
+                    *(self._send_dm_bounded(*item) for item in dm_queue),
+                    return_exceptions=True,
+                )
+                sent_flags.extend(dm_flags)
 
         except Exception as e:
-            self.logger.error(f"Error in notification loop: {e}", exc_info=True)
-            await asyncio.sleep(NOTIFICATION_CHECK_INTERVAL_SECONDS * 2)
+            logger.error("Error in notification loop: %s", e, exc_info=True)
+            self._next_check_at = None
+            self._consecutive_errors += 1
+            if self._consecutive_errors >= ERROR_BACKOFF_THRESHOLD:
+                exponent = self._consecutive_errors - ERROR_BACKOFF_THRESHOLD + 1
+                backoff = min(MAX_BACKOFF_SECONDS, NOTIFICATION_CHECK_INTERVAL_SECONDS * 2 ** exponent)
+                self.check_events_loop.change_interval(seconds=backoff)
+                logger.warning("Notification loop failed %s times in a row, next check in %ss",
+                               self._consecutive_errors, backoff)
+        else:
+            if self._consecutive_errors:
+                self._consecutive_errors = 0
+                self.check_events_loop.change_interval(seconds=NOTIFICATION_CHECK_INTERVAL_SECONDS)
+        finally:
+            # Flush even after an error so already-sent notifications are not repeated
+            if sent_flags:
+                try:
+                    await database.mark_notifications_sent(sent_flags)
+                except Exception as e:
+                    logger.error("Error saving notification flags: %s", e, exc_info=True)
 
     @tasks.loop(hours=CLEANUP_INTERVAL_HOURS)
     async def cleanup_old_events_loop(self):
         """Clean up old events without writeups."""
         await self.bot.wait_until_ready()
-        self.logger.info("Running old event cleanup...")
+        logger.info("Running old event cleanup...")
         try:
             deleted_count = await database.cleanup_old_events(days_old=365)
             if deleted_count > 0:
-                self.logger.info(f"Cleaned up {deleted_count} old events from the database.")
+                logger.info("Cleaned up %s old events from the database.", deleted_count)
             else:
-                self.logger.debug("No old events to clean up.")
+                logger.debug("No old events to clean up.")
+            await database.checkpoint_database()
         except Exception as e:
-            self.logger.error(f"Error during old event cleanup: {e}", exc_info=True)
+            logger.error("Error during old event cleanup: %s", e, exc_info=True)
 
     @check_events_loop.before_loop
     async def before_check_events(self):
         await self.bot.wait_until_ready()
-        self.logger.info("Notification check loop is ready.")
+        logger.info("Notification check loop is ready.")
 
     @cleanup_old_events_loop.before_loop
     async def before_cleanup(self):
         await self.bot.wait_until_ready()
-        self.logger.info("Cleanup loop is ready.")
+        logger.info("Cleanup loop is ready.")
 
 
 # --- Setup Function ---
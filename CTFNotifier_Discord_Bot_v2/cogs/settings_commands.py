@@ -4,10 +4,13 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 import logging
+from datetime import datetime, timezone as dt_timezone  # commands take a `timezone` str parameter
 from typing import Optional
 
 from utils import database, helpers
 
+logger = logging.getLogger(__name__)
+
 # --- Constants ---
 CYBER_THEME_COLOR = 0x00FFFF
 
@@ -15,8 +18,7 @@ CYBER_THEME_COLOR = 0x00FFFF
 class SettingsCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.logger = logging.getLogger(f"{__name__}")
-        self.logger.info("SettingsCommands Cog initialized.")
+        logger.info("SettingsCommands Cog initialized.")
 
     # --- Timezone Commands ---
     @app_commands.command(
@@ -50,7 +52,7 @@ class SettingsCommands(commands.Cog):
         embed.add_field(
             name="Current Time",
             value=helpers.format_datetime_local(
-                __import__('datetime').datetime.now(__import__('pytz').utc),
+                datetime.now(dt_timezone.utc),
                 timezone
             ),
             inline=False
@@ -58,7 +60,7 @@ class SettingsCommands(commands.Cog):
         embed.set_footer(text="Event times in custom events will use this timezone")
 
         await interaction.followup.send(embed=embed, ephemeral=True)
-        self.logger.info(f"User {interaction.user.id} set timezone to {timezone}")
+        logger.info("User %s set timezone to %s", interaction.user.id, timezone)
 
     @set_timezone.autocomplete("timezone")
     async def timezone_autocomplete(
@@ -168,7 +170,7 @@ class SettingsCommands(commands.Cog):
         )
 
         await interaction.followup.send(embed=embed, ephemeral=True)
-        self.logger.info(f"User {interaction.user.id} updated notification settings")
+        logger.info("User %s updated notification settings", interaction.user.id)
 
     # --- Server Settings (Admin only) ---
     @app_commands.command(
@@ -217,7 +219,7 @@ class SettingsCommands(commands.Cog):
         embed.set_footer(text="Users can disable channel notifications in their personal settings")
 
         await interaction.followup.send(embed=embed, ephemeral=True)
-        self.logger.info(f"Server {interaction.guild.id} set notification channel to {channel.id}")
+        logger.info("Server %s set notification channel to %s", interaction.guild.id, channel.id)
 
     @app_commands.command(
         name="remove_channel",
@@ -243,7 +245,7 @@ class SettingsCommands(commands.Cog):
         )
 
         await interaction.followup.send(embed=embed, ephemeral=True)
-        self.logger.info(f"Server {interaction.guild.id} removed notification channel")
+        logger.info("Server %s removed notification channel", interaction.guild.id)
 
     # --- View Current Settings ---
     @app_commands.command(
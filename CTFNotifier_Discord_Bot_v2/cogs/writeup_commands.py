@@ -9,6 +9,8 @@ from datetime import datetime
 
 from utils import database
 
+logger = logging.getLogger(__name__)
+
 # --- Constants ---
 CYBER_THEME_COLOR = 0x00FFFF
 
@@ -34,24 +36,17 @@ CTF_CATEGORIES = [
 class WriteupCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.logger = logging.getLogger(f"{__name__}")
-        self.logger.info("WriteupCommands Cog initialized.")
+        logger.info("WriteupCommands Cog initialized.")
 
     async def event_autocomplete(
         self, interaction: discord.Interaction, current: str
     ) -> list[app_commands.Choice[str]]:
         """Autocomplete for event names (includes past events)."""
-        user_events = await database.get_user_events(interaction.user.id, include_past=True)
-        choices = []
-        for event in user_events:
-            if current.lower() in event["event_name"].lower():
-                display_name = event["event_name"][:99]
-                choices.append(
-                    app_commands.Choice(name=display_name, value=event["event_name"])
-                )
-            if len(choices) >= 25:
-                break
-        return choices
+        event_names = await database.search_user_event_names(interaction.user.id, current)
+        return [
+            app_commands.Choice(name=name[:99], value=name)
+            for name in event_names
+        ]
 
     async def category_autocomplete(
         self, interaction: discord.Interaction, current: str
@@ -139,7 +134,7 @@ class WriteupCommands(commands.Cog):
         embed.set_footer(text=f"Writeup ID: {writeup_id}")
 
         await interaction.followup.send(embed=embed, ephemeral=True)
-        self.logger.info(f"User {interaction.user.id} added writeup for event {event_name}")
+        logger.info("User %s added writeup for event %s", interaction.user.id, event_name)
 
     @add_writeup.autocomplete("event_name")
     async def writeup_event_autocomplete(
@@ -299,7 +294,7 @@ class WriteupCommands(commands.Cog):
                 f"✅ Writeup #{writeup_id} has been deleted.",
                 ephemeral=True
             )
-            self.logger.info(f"User {interaction.user.id} deleted writeup {writeup_id}")
+            logger.info("User %s deleted writeup %s", interaction.user.id, writeup_id)
         else:
             await interaction.followup.send(
                 f"Could not delete writeup #{writeup_id}. Make sure it exists and belongs to you.",
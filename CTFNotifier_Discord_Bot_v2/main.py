@@ -43,15 +43,19 @@ file_handler.setFormatter(
 logging.getLogger().addHandler(file_handler)
 
 # --- Bot Setup ---
-intents = discord.Intents.default()
-intents.members = True  # Required for fetching members for teams and threads
+# Slash commands and DMs only: no message, presence or member gateway events are needed.
+# Team members are resolved with guild.fetch_member (REST) when they are not cached.
+intents = discord.Intents(guilds=True, dm_messages=True)
 
 
 class CTFNotifierBot(commands.Bot):
     def __init__(self):
         super().__init__(
             command_prefix=commands.when_mentioned_or("!"),
-            intents=intents
+            intents=intents,
+            chunk_guilds_at_startup=False,
+            member_cache_flags=discord.MemberCacheFlags.none(),
+            max_messages=None,
         )
         self.synced = False
 
@@ -115,6 +119,7 @@ class CTFNotifierBot(commands.Bot):
         logger.info("Bot shutting down, cleaning up...")
         await ctftime_api.close_session()
         await super().close()
+        await database.close_database()
 
 
 bot = CTFNotifierBot()
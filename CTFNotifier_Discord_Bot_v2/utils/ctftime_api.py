@@ -1,9 +1,11 @@
 # utils/ctftime_api.py
 
 import asyncio
+import copy
 import json
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 from typing import Optional
 
 import aiohttp
@@ -13,14 +15,18 @@ HEADERS = {
     "User-Agent": "CTFNotifierDiscordBot/2.0 (+https://github.com/N04H2601/CTFNotifier_Discord_Bot)"
 }
 REQUEST_TIMEOUT = 10  # seconds
+CONNECTION_LIMIT = 8  # concurrent sockets to CTFtime
+DNS_CACHE_TTL_SECONDS = 300
 
-# Simple in-memory cache with TTL
+# Simple in-memory cache with TTL: key -> (value, stored_at_monotonic, ttl)
 _cache: dict = {}
 CACHE_TTL_SECONDS = 300  # 5 minutes
+EVENT_CACHE_TTL_SECONDS = 600  # event details rarely change; shared across users adding the same CTF
+UPCOMING_CACHE_TTL_SECONDS = 60  # /upcoming bursts within a minute share one round trip
 
 # Rate limiter: max 10 requests per 60 seconds to CTFtime
 _rate_limit_lock = asyncio.Lock()
-_request_timestamps: list = []
+_request_timestamps: list = []  # time.monotonic() of recent requests
 RATE_LIMIT_MAX_REQUESTS = 10
 RATE_LIMIT_WINDOW_SECONDS = 60
 
@@ -33,7 +39,8 @@ async def _get_session() -> aiohttp.ClientSession:
     global _session
     if _session is None or _session.closed:
         timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
-        _session = aiohttp.ClientSession(timeout=timeout, headers=HEADERS)
+        connector = aiohttp.TCPConnector(limit=CONNECTION_LIMIT, ttl_dns_cache=DNS_CACHE_TTL_SECONDS)
+        _session = aiohttp.ClientSession(timeout=timeout, headers=HEADERS, connector=connector)
     return _session
 
 
@@ -48,36 +55,36 @@ async def close_session():
 async def _check_rate_limit():
     """Wait if we're approaching the rate limit."""
     async with _rate_limit_lock:
-        now = datetime.now()
+        now = time.monotonic()
         # Remove timestamps older than the window
         _request_timestamps[:] = [
             ts for ts in _request_timestamps
-            if (now - ts).total_seconds() < RATE_LIMIT_WINDOW_SECONDS
+            if now - ts < RATE_LIMIT_WINDOW_SECONDS
         ]
         if len(_request_timestamps) >= RATE_LIMIT_MAX_REQUESTS:
             # Wait until the oldest request expires from the window
             oldest = _request_timestamps[0]
-            wait_time = RATE_LIMIT_WINDOW_SECONDS - (now - oldest).total_seconds()
+            wait_time = RATE_LIMIT_WINDOW_SECONDS - (now - oldest)
             if wait_time > 0:
                 logging.warning(f"CTFtime API rate limit reached, waiting {wait_time:.1f}s")
                 await asyncio.sleep(wait_time)
-        _request_timestamps.append(datetime.now())
+        _request_timestamps.append(time.monotonic())
 
 
 def _get_cached(key: str) -> Optional[dict]:
     """Get cached value if not expired."""
     if key in _cache:
-        value, timestamp = _cache[key]
-        if (datetime.now() - timestamp).total_seconds() < CACHE_TTL_SECONDS:
+        value, timestamp, ttl = _cache[key]
+        if time.monotonic() - timestamp < ttl:
             logging.debug(f"Cache hit for key: {key}")
             return value
         del _cache[key]
     return None
 
 
-def _set_cache(key: str, value) -> None:
-    """Set cache value with current timestamp."""
-    _cache[key] = (value, datetime.now())
+def _set_cache(key: str, value, ttl: float = CACHE_TTL_SECONDS) -> None:
+    """Set cache value with current timestamp and its time-to-live."""
+    _cache[key] = (value, time.monotonic(), ttl)
     logging.debug(f"Cached value for key: {key}")
 
 
@@ -91,10 +98,10 @@ async def fetch_event_details(event_id: int) -> Optional[dict]:
     """Fetches details for a specific event ID from CTFtime API (async)."""
     cache_key = f"event_{event_id}"
 
-    # Check cache first
+    # Check cache first; callers annotate the dict (e.g. ctftime_id), so hand out a copy
     cached = _get_cached(cache_key)
-    if cached:
-        return cached
+    if cached is not None:
+        return copy.deepcopy(cached)
 
     await _check_rate_limit()
     url = f"{CTFTIME_API_BASE}/events/{event_id}/"
@@ -125,8 +132,8 @@ async def fetch_event_details(event_id: int) -> Optional[dict]:
 
         # Parse dates safely
         try:
-            event_data["start"] = datetime.fromisoformat(event_data["start"])
-            event_data["finish"] = datetime.fromisoformat(event_data["finish"])
+            event_data["start"] = datetime.fromisoformat(event_data["start"]).astimezone(timezone.utc)
+            event_data["finish"] = datetime.fromisoformat(event_data["finish"]).astimezone(timezone.utc)
         except (ValueError, TypeError) as e:
             logging.error(f"Error parsing dates for event ID {event_id}: {e}")
             return None
@@ -170,7 +177,7 @@ async def fetch_event_details(event_id: int) -> Optional[dict]:
             event_data["team_size"]["min"] = event_data.get("min_team_size")
 
         # Cache the result
-        _set_cache(cache_key, event_data)
+        _set_cache(cache_key, copy.deepcopy(event_data), EVENT_CACHE_TTL_SECONDS)
 
         return event_data
 
@@ -186,29 +193,20 @@ async def fetch_event_details(event_id: int) -> Optional[dict]:
     return None
 
 
-async def fetch_upcoming_events(
-    limit: int = 15,
-    format_filter: Optional[str] = None,
-    min_weight: Optional[float] = None
-) -> list:
-    """Fetches upcoming events from CTFtime API (async).
+async def _fetch_upcoming_list(count: int) -> Optional[list]:
+    """Fetches and date-parses the next `count` upcoming events (cached, unfiltered).
 
-    Args:
-        limit: Maximum number of events to fetch (default: 15)
-        format_filter: Optional filter by format (e.g., "Jeopardy", "Attack-Defense")
-        min_weight: Optional minimum weight filter
+    Returns None on failure so errors are never cached.
     """
-    cache_key = f"upcoming_{limit}"
+    cache_key = f"upcoming_{count}"
 
-    # Check cache first (only for unfiltered requests)
-    if not format_filter and not min_weight:
-        cached = _get_cached(cache_key)
-        if cached:
-            return cached
+    cached = _get_cached(cache_key)
+    if cached is not None:
+        return cached
 
     await _check_rate_limit()
     url = f"{CTFTIME_API_BASE}/events/"
-    params = {"limit": limit * 2 if (format_filter or min_weight) else limit}  # Fetch more if filtering
+    params = {"limit": count}
 
     try:
         session = await _get_session()
@@ -217,7 +215,7 @@ async def fetch_upcoming_events(
                 logging.error(
                     f"HTTP error occurred while fetching upcoming events: Status {response.status}"
                 )
-                return []
+                return None
 
             events_list = await response.json()
 
@@ -233,35 +231,17 @@ async def fetch_upcoming_events(
                     )
                     continue
 
-                event["start_dt"] = datetime.fromisoformat(event["start"])
-                event["finish_dt"] = datetime.fromisoformat(event["finish"])
-
-                # Apply filters
-                if format_filter:
-                    event_format = event.get("format", "").lower()
-                    if format_filter.lower() not in event_format:
-                        continue
-
-                if min_weight is not None:
-                    event_weight = event.get("weight", 0.0)
-                    if event_weight < min_weight:
-                        continue
-
+                event["start_dt"] = datetime.fromisoformat(event["start"]).astimezone(timezone.utc)
+                event["finish_dt"] = datetime.fromisoformat(event["finish"]).astimezone(timezone.utc)
                 processed_events.append(event)
 
-                if len(processed_events) >= limit:
-                    break
-
             except (ValueError, TypeError) as e:
                 logging.warning(
                     f"Error processing date for upcoming event {event.get('title', 'N/A')}: {e}"
                 )
                 continue
 
-        # Cache only unfiltered results
-        if not format_filter and not min_weight:
-            _set_cache(cache_key, processed_events)
-
+        _set_cache(cache_key, processed_events, UPCOMING_CACHE_TTL_SECONDS)
         return processed_events
 
     except asyncio.TimeoutError:
@@ -273,7 +253,43 @@ async def fetch_upcoming_events(
     except Exception as e:
         logging.error(f"Unexpected error while fetching upcoming events: {e}", exc_info=True)
 
-    return []
+    return None
+
+
+async def fetch_upcoming_events(
+    limit: int = 15,
+    format_filter: Optional[str] = None,
+    min_weight: Optional[float] = None
+) -> list:
+    """Fetches upcoming events from CTFtime API (async).
+
+    The raw list is cached per fetch size, so filtered and unfiltered
+    requests share the same CTFtime round trip.
+
+    Args:
+        limit: Maximum number of events to fetch (default: 15)
+        format_filter: Optional filter by format (e.g., "Jeopardy", "Attack-Defense")
+        min_weight: Optional minimum weight filter
+    """
+    fetch_limit = limit * 2 if (format_filter or min_weight) else limit  # Fetch more if filtering
+    events_list = await _fetch_upcoming_list(fetch_limit)
+    if not events_list:
+        return []
+
+    format_lower = format_filter.lower() if format_filter else None
+    matches = []
+    for event in events_list:
+        # Apply filters
+        if format_lower and format_lower not in event.get("format", "").lower():
+            continue
+        if min_weight is not None and event.get("weight", 0.0) < min_weight:
+            continue
+
+        matches.append(event)
+        if len(matches) >= limit:
+            break
+
+    return matches
 
 
 async def search_events(query: str, limit: int = 10) -> list:
@@ -1,10 +1,13 @@
 # utils/database.py
 
 import aiosqlite
+import asyncio
 import logging
+import time
+from contextlib import asynccontextmanager
 from pathlib import Path
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 
 BASE_DIR = Path(__file__).resolve().parent.parent  # <project root>
 DATA_DIR = BASE_DIR / "data"
@@ -15,10 +18,182 @@ DATABASE_PATH = DATA_DIR / "ctf_data.db"
 # Default timezone
 DEFAULT_TIMEZONE = "Europe/Paris"
 
+# Bumped whenever _migrate_schema learns a new step (stored in PRAGMA user_version)
+SCHEMA_VERSION = 2
+
+# Bits of user_events.notification_flags (set once the notification has been sent)
+FLAG_REMINDER = 1
+FLAG_GOOD_LUCK = 2
+FLAG_ENDING_SOON = 4
+FLAG_CONGRATULATIONS = 8
+FLAG_CHANNEL_REMINDER = 16
+ALL_NOTIFICATION_FLAGS = (
+    FLAG_REMINDER | FLAG_GOOD_LUCK | FLAG_ENDING_SOON | FLAG_CONGRATULATIONS | FLAG_CHANNEL_REMINDER
+)
+
+# Autocomplete fires on every keystroke: keep recent results per (user, query) briefly
+_autocomplete_cache: Dict[Tuple[int, str, int], Tuple[float, List[str]]] = {}
+AUTOCOMPLETE_CACHE_TTL_SECONDS = 10
+AUTOCOMPLETE_CACHE_MAX_ENTRIES = 512
+
+# /agenda is usually followed by /details: keep the rows it just read per user, keyed by event name
+_user_events_cache: Dict[int, Tuple[float, Dict[str, Dict]]] = {}
+USER_EVENTS_CACHE_TTL_SECONDS = 30
+USER_EVENTS_CACHE_MAX_USERS = 256
+
+# Bumped whenever a write can make a notification due earlier than previously computed
+_notification_schedule_version = 0
+
+
+# One connection (and aiosqlite worker thread) for the whole bot. SQLite allows a single
+# writer anyway, so write transactions are serialized with _write_lock instead.
+_conn: Optional[aiosqlite.Connection] = None
+_write_lock = asyncio.Lock()
+
+
+async def _get_connection() -> aiosqlite.Connection:
+    """Returns the shared connection, opening it on first use."""
+    global _conn
+    if _conn is None:
+        conn = await aiosqlite.connect(DATABASE_PATH, cached_statements=256)
+        conn.row_factory = aiosqlite.Row
+        # WAL (set once in initialize_database) keeps readers from blocking on the writer;
+        # NORMAL sync is crash-safe in WAL mode and skips the fsync on every commit.
+        # mmap serves reads from the page cache instead of read() syscalls (64 MiB cap), and a
+        # ~20 MB page cache keeps the hot tables and indexes resident on the long-lived connection.
+        await conn.executescript(
+            "PRAGMA synchronous = NORMAL; PRAGMA temp_store = MEMORY; "
+            "PRAGMA mmap_size = 67108864; PRAGMA cache_size = -20000;"
+        )
+        if _conn is None:
+            _conn = conn
+        else:
+            await conn.close()  # another task opened it while we were connecting
+    return _conn
+
+
+@asynccontextmanager
+async def _connect() -> AsyncIterator[aiosqlite.Connection]:
+    """Yields the shared connection for reads."""
+    yield await _get_connection()
+
+
+@asynccontextmanager
+async def _transaction() -> AsyncIterator[aiosqlite.Connection]:
+    """Yields the shared connection for a write; commits on success, rolls back on error.
+
+    Do not call other writing database functions inside the block: the lock is not reentrant.
+    """
+    async with _write_lock:
+        db = await _get_connection()
+        try:
+            yield db
+        except BaseException:
+            await db.rollback()
+            raise
+        await db.commit()
+
+
+async def close_database():
+    """Refreshes planner statistics and closes the shared connection (call on shutdown)."""
+    global _conn
+    async with _write_lock:
+        if _conn is None:
+            return
+        await _conn.execute("PRAGMA optimize")
+        await _conn.close()
+        _conn = None
+
+
+def _invalidate_user_cache(user_id: int):
+    """Drops cached lookups for a user whose agenda just changed."""
+    for key in [key for key in _autocomplete_cache if key[0] == user_id]:
+        del _autocomplete_cache[key]
+    _user_events_cache.pop(user_id, None)
+
+
+def _bump_notification_schedule():
+    """Tells the notification loop its cached next-wakeup time may be stale."""
+    global _notification_schedule_version
+    _notification_schedule_version += 1
+
+
+def get_notification_schedule_version() -> int:
+    """Current notification schedule version (see get_next_notification_time)."""
+    return _notification_schedule_version
+
+
+def _cache_user_event_rows(user_id: int, rows: List[Dict]):
+    """Remembers agenda rows so a following get_event_details can skip SQL."""
+    now = time.monotonic()
+    cached = _user_events_cache.get(user_id)
+    if cached and now - cached[0] < USER_EVENTS_CACHE_TTL_SECONDS:
+        # Merge into the live entry without extending its lifetime
+        cached[1].update((row["event_name"], row) for row in rows)
+        return
+
+    if len(_user_events_cache) >= USER_EVENTS_CACHE_MAX_USERS:
+        for key in [key for key, (ts, _) in _user_events_cache.items()
+                    if now - ts >= USER_EVENTS_CACHE_TTL_SECONDS]:
+            del _user_events_cache[key]
+    _user_events_cache[user_id] = (now, {row["event_name"]: row for row in rows})
+
+
+def _to_epoch(dt: datetime) -> int:
+    """Converts a datetime to unix epoch seconds (naive datetimes are treated as UTC)."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+async def _migrate_schema(db: aiosqlite.Connection):
+    """Upgrades databases created by older versions of the bot in place."""
+    async with db.execute("PRAGMA user_version") as cursor:
+        version = (await cursor.fetchone())[0]
+
+    if version < 1:
+        # v1: event times are stored as INTEGER unix epoch seconds instead of TIMESTAMP text
+        for column in ("start_time", "end_time"):
+            await db.execute(f"""
+                UPDATE events SET {column} = CAST(strftime('%s', {column}) AS INTEGER)
+                WHERE typeof({column}) = 'text' AND strftime('%s', {column}) IS NOT NULL
+            """)
+        logging.info("Migrated event times to unix epoch seconds.")
+
+    if version < 2:
+        # v2: the five *_sent columns of user_events are packed into one notification_flags bitmap
+        async with db.execute("PRAGMA table_info(user_events)") as cursor:
+            columns = {row[1] for row in await cursor.fetchall()}
+        legacy_flags = {
+            "reminder_sent": FLAG_REMINDER,
+            "good_luck_sent": FLAG_GOOD_LUCK,
+            "ending_soon_sent": FLAG_ENDING_SOON,
+            "congratulations_sent": FLAG_CONGRATULATIONS,
+            "channel_reminder_sent": FLAG_CHANNEL_REMINDER,
+        }
+        if "reminder_sent" in columns:
+            await db.execute(
+                "ALTER TABLE user_events ADD COLUMN notification_flags INTEGER NOT NULL DEFAULT 0"
+            )
+            packed = " | ".join(
+                f"(IFNULL({column}, 0) != 0) * {bit}" for column, bit in legacy_flags.items()
+            )
+            await db.execute(f"UPDATE user_events SET notification_flags = {packed}")
+            for column in legacy_flags:
+                await db.execute(f"ALTER TABLE user_events DROP COLUMN {column}")
+            logging.info("Packed user_events notification flags into a bitmap column.")
+
+    if version < SCHEMA_VERSION:
+        await db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
 
 async def initialize_database():
     """Initializes the SQLite database and creates tables if they don't exist."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    db = await _get_connection()
+    # Journal mode is persistent, so this only needs to run once per database file (outside a transaction)
+    await db.execute("PRAGMA journal_mode = WAL")
+
+    async with _transaction() as db:
         # User settings table
         await db.execute("""
             CREATE TABLE IF NOT EXISTS user_settings (
@@ -53,8 +228,8 @@ async def initialize_database():
                 ctftime_url TEXT,
                 ctftime_id INTEGER,
                 event_url TEXT,
-                start_time TIMESTAMP NOT NULL,
-                end_time TIMESTAMP NOT NULL,
+                start_time INTEGER NOT NULL,  -- unix epoch seconds (UTC)
+                end_time INTEGER NOT NULL,    -- unix epoch seconds (UTC)
                 format TEXT,
                 organizers TEXT,
                 weight REAL DEFAULT 0.0,
@@ -73,11 +248,7 @@ async def initialize_database():
                 user_id INTEGER NOT NULL,
                 event_id INTEGER NOT NULL,
                 server_id INTEGER,
-                reminder_sent INTEGER DEFAULT 0,
-                good_luck_sent INTEGER DEFAULT 0,
-                ending_soon_sent INTEGER DEFAULT 0,
-                congratulations_sent INTEGER DEFAULT 0,
-                channel_reminder_sent INTEGER DEFAULT 0,
+                notification_flags INTEGER NOT NULL DEFAULT 0,  -- FLAG_* bits
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (event_id) REFERENCES events(id) ON DELETE CASCADE,
                 UNIQUE(user_id, event_id)
@@ -120,9 +291,11 @@ async def initialize_database():
         await db.execute("CREATE INDEX IF NOT EXISTS idx_events_end ON events(end_time)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_event_members_event ON event_members(event_id)")
         await db.execute("CREATE INDEX IF NOT EXISTS idx_writeups_event ON writeups(event_id)")
+        await db.execute("CREATE INDEX IF NOT EXISTS idx_writeups_user ON writeups(user_id, created_at)")
 
-        await db.commit()
-        logging.info("Database initialized successfully with new schema.")
+        await _migrate_schema(db)
+
+    logging.info("Database initialized successfully with new schema.")
 
 
 # =====================
@@ -131,8 +304,7 @@ async def initialize_database():
 
 async def get_user_settings(user_id: int) -> Dict[str, Any]:
     """Get user settings, creating defaults if not exists."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         async with db.execute(
             "SELECT * FROM user_settings WHERE user_id = ?", (user_id,)
         ) as cursor:
@@ -140,32 +312,32 @@ async def get_user_settings(user_id: int) -> Dict[str, Any]:
             if row:
                 return dict(row)
 
-        # Create default settings
+    # Create default settings
+    async with _transaction() as db:
         await db.execute(
-            "INSERT INTO user_settings (user_id) VALUES (?)", (user_id,)
+            "INSERT OR IGNORE INTO user_settings (user_id) VALUES (?)", (user_id,)
         )
-        await db.commit()
-        return {
-            "user_id": user_id,
-            "timezone": DEFAULT_TIMEZONE,
-            "reminder_1h_before": 1,
-            "good_luck_on_start": 1,
-            "ending_soon_1h": 1,
-            "congratulations_on_end": 1,
-            "channel_notification": 1,
-        }
+    _bump_notification_schedule()  # defaults enable every notification
+    return {
+        "user_id": user_id,
+        "timezone": DEFAULT_TIMEZONE,
+        "reminder_1h_before": 1,
+        "good_luck_on_start": 1,
+        "ending_soon_1h": 1,
+        "congratulations_on_end": 1,
+        "channel_notification": 1,
+    }
 
 
 async def update_user_timezone(user_id: int, timezone: str) -> bool:
     """Update user's timezone."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        await get_user_settings(user_id)  # Ensure user exists
+    await get_user_settings(user_id)  # Ensure user exists
+    async with _transaction() as db:
         await db.execute(
             "UPDATE user_settings SET timezone = ?, updated_at = CURRENT_TIMESTAMP WHERE user_id = ?",
             (timezone, user_id)
         )
-        await db.commit()
-        return True
+    return True
 
 
 async def update_user_notification_settings(
@@ -204,12 +376,12 @@ async def update_user_notification_settings(
     updates.append("updated_at = CURRENT_TIMESTAMP")
     values.append(user_id)
 
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _transaction() as db:
         await db.execute(
             f"UPDATE user_settings SET {', '.join(updates)} WHERE user_id = ?",
             tuple(values)
         )
-        await db.commit()
+        _bump_notification_schedule()
         return True
 
 
@@ -219,8 +391,7 @@ async def update_user_notification_settings(
 
 async def get_server_settings(server_id: int) -> Dict[str, Any]:
     """Get server settings."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         async with db.execute(
             "SELECT * FROM server_settings WHERE server_id = ?", (server_id,)
         ) as cursor:
@@ -232,7 +403,7 @@ async def get_server_settings(server_id: int) -> Dict[str, Any]:
 
 async def set_notification_channel(server_id: int, channel_id: Optional[int]) -> bool:
     """Set the notification channel for a server."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _transaction() as db:
         await db.execute("""
             INSERT INTO server_settings (server_id, notification_channel_id)
             VALUES (?, ?)
@@ -240,7 +411,6 @@ async def set_notification_channel(server_id: int, channel_id: Optional[int]) ->
                 notification_channel_id = excluded.notification_channel_id,
                 updated_at = CURRENT_TIMESTAMP
         """, (server_id, channel_id))
-        await db.commit()
         return True
 
 
@@ -248,11 +418,71 @@ async def set_notification_channel(server_id: int, channel_id: Optional[int]) ->
 # EVENTS
 # =====================
 
+# Hot-path statements are kept as single constants so every call hands sqlite3
+# the exact same SQL text and hits its compiled-statement cache.
+ADD_EVENT_TO_USER_SQL = """
+    INSERT INTO user_events (user_id, event_id, server_id)
+    VALUES (?, ?, ?)
+    ON CONFLICT(user_id, event_id) DO NOTHING
+    RETURNING 1
+"""
+
+# Agenda reads are pinned to "this user's rows first, then the event by rowid": a missing or
+# skewed sqlite_stat1 could otherwise tempt the planner into walking idx_events_start to dodge
+# the ORDER BY sort, which scans every user's events.
+GET_USER_EVENTS_SQL = """
+    SELECT e.*, ue.notification_flags, ue.server_id
+    FROM user_events ue INDEXED BY idx_user_events_user
+    CROSS JOIN events e ON e.id = ue.event_id
+    WHERE ue.user_id = ?
+    ORDER BY e.start_time ASC
+"""
+
+GET_USER_UPCOMING_EVENTS_SQL = """
+    SELECT e.*, ue.notification_flags, ue.server_id
+    FROM user_events ue INDEXED BY idx_user_events_user
+    CROSS JOIN events e ON e.id = ue.event_id
+    WHERE ue.user_id = ? AND e.end_time >= ?
+    ORDER BY e.start_time ASC
+"""
+
+# Keyset pagination on (start_time, id): each page is a bounded index walk, no OFFSET scan
+GET_USER_EVENTS_PAGE_SQL = """
+    SELECT e.*, ue.notification_flags, ue.server_id
+    FROM user_events ue INDEXED BY idx_user_events_user
+    CROSS JOIN events e ON e.id = ue.event_id
+    WHERE ue.user_id = :user_id
+      AND (:now IS NULL OR e.end_time >= :now)
+      AND (:after_start IS NULL OR (e.start_time, e.id) > (:after_start, :after_id))
+    ORDER BY e.start_time ASC, e.id ASC
+    LIMIT :limit
+"""
+
+COUNT_USER_EVENTS_SQL = """
+    SELECT COUNT(*)
+    FROM user_events ue
+    CROSS JOIN events e ON e.id = ue.event_id
+    WHERE ue.user_id = :user_id
+      AND (:now IS NULL OR e.end_time >= :now)
+"""
+
+GET_EVENT_DETAILS_SQL = """
+    SELECT e.*, ue.notification_flags, ue.server_id
+    FROM events e
+    JOIN user_events ue ON e.id = ue.event_id
+    WHERE ue.user_id = ? AND e.event_name = ?
+"""
+
+REMOVE_EVENT_FROM_USER_SQL = """
+    DELETE FROM user_events
+    WHERE user_id = ? AND event_id = (SELECT id FROM events WHERE event_name = ?)
+"""
+
+CLEAR_USER_EVENTS_SQL = "DELETE FROM user_events WHERE user_id = ?"
+
 async def get_or_create_event(event_data: dict) -> Optional[int]:
     """Get existing event or create new one. Returns event ID."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-
+    async with _connect() as db:
         # Check if event already exists
         async with db.execute(
             "SELECT id FROM events WHERE event_name = ?",
@@ -262,8 +492,18 @@ async def get_or_create_event(event_data: dict) -> Optional[int]:
             if row:
                 return row["id"]
 
-        # Create new event
-        try:
+    # Create new event
+    try:
+        async with _transaction() as db:
+            # Re-check under the write lock: a concurrent add may have just created it
+            async with db.execute(
+                "SELECT id FROM events WHERE event_name = ?",
+                (event_data["event_name"],)
+            ) as cursor:
+                row = await cursor.fetchone()
+                if row:
+                    return row["id"]
+
             cursor = await db.execute("""
                 INSERT INTO events (
                     event_name, title, ctftime_url, ctftime_id, event_url,
@@ -276,8 +516,8 @@ async def get_or_create_event(event_data: dict) -> Optional[int]:
                 event_data.get("ctftime_url"),
                 event_data.get("ctftime_id"),
                 event_data.get("url"),
-                event_data["start"],
-                event_data["finish"],
+                _to_epoch(event_data["start"]),
+                _to_epoch(event_data["finish"]),
                 event_data.get("format"),
                 event_data.get("organizers"),
                 event_data.get("weight", 0.0),
@@ -286,11 +526,10 @@ async def get_or_create_event(event_data: dict) -> Optional[int]:
                 event_data.get("is_custom", 0),
                 event_data.get("created_by"),
             ))
-            await db.commit()
-            return cursor.lastrowid
-        except aiosqlite.IntegrityError:
-            logging.warning(f"Event '{event_data['event_name']}' already exists.")
-            return None
+        return cursor.lastrowid
+    except aiosqlite.IntegrityError:
+        logging.warning(f"Event '{event_data['event_name']}' already exists.")
+        return None
 
 
 async def add_event_to_user(user_id: int, event_data: dict, server_id: Optional[int] = None) -> bool:
@@ -299,69 +538,88 @@ async def add_event_to_user(user_id: int, event_data: dict, server_id: Optional[
     if not event_id:
         return False
 
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        try:
-            await db.execute("""
-                INSERT INTO user_events (user_id, event_id, server_id)
-                VALUES (?, ?, ?)
-            """, (user_id, event_id, server_id))
-            await db.commit()
-            logging.info(f"Event '{event_data['event_name']}' added for user {user_id}.")
-            return True
-        except aiosqlite.IntegrityError:
-            logging.warning(f"Event already in user {user_id}'s agenda.")
-            return False
+    async with _transaction() as db:
+        # The UNIQUE(user_id, event_id) index answers "already added?" in the same statement
+        async with db.execute(ADD_EVENT_TO_USER_SQL, (user_id, event_id, server_id)) as cursor:
+            added = await cursor.fetchone() is not None
+
+    if not added:
+        logging.warning(f"Event already in user {user_id}'s agenda.")
+        return False
+
+    _invalidate_user_cache(user_id)
+    _bump_notification_schedule()
+    logging.info(f"Event '{event_data['event_name']}' added for user {user_id}.")
+    return True
 
 
 async def get_user_events(user_id: int, include_past: bool = False) -> List[Dict]:
     """Retrieves all events for a specific user."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-
+    async with _connect() as db:
         if include_past:
-            query = """
-                SELECT e.*, ue.reminder_sent, ue.good_luck_sent,
-                       ue.ending_soon_sent, ue.congratulations_sent, ue.server_id
-                FROM events e
-                JOIN user_events ue ON e.id = ue.event_id
-                WHERE ue.user_id = ?
-                ORDER BY e.start_time ASC
-            """
+            query, params = GET_USER_EVENTS_SQL, (user_id,)
         else:
-            query = """
-                SELECT e.*, ue.reminder_sent, ue.good_luck_sent,
-                       ue.ending_soon_sent, ue.congratulations_sent, ue.server_id
-                FROM events e
-                JOIN user_events ue ON e.id = ue.event_id
-                WHERE ue.user_id = ? AND e.end_time >= datetime('now')
-                ORDER BY e.start_time ASC
-            """
-
-        async with db.execute(query, (user_id,)) as cursor:
-            rows = await cursor.fetchall()
-            return [dict(row) for row in rows]
+            query, params = GET_USER_UPCOMING_EVENTS_SQL, (user_id, int(time.time()))
+
+        async with db.execute(query, params) as cursor:
+            events = [dict(row) for row in await cursor.fetchall()]
+
+    _cache_user_event_rows(user_id, [dict(event) for event in events])
+    return events
+
+
+async def get_user_events_page(
+    user_id: int,
+    include_past: bool = False,
+    after: Optional[Tuple[int, int]] = None,
+    limit: int = 10
+) -> List[Dict]:
+    """Retrieves one page of a user's events, ordered by start time.
+
+    Args:
+        after: (start_time, id) of the last event on the previous page, or None for the first page.
+    """
+    params = {
+        "user_id": user_id,
+        "now": None if include_past else int(time.time()),
+        "after_start": after[0] if after else None,
+        "after_id": after[1] if after else None,
+        "limit": limit,
+    }
+    async with _connect() as db:
+        async with db.execute(GET_USER_EVENTS_PAGE_SQL, params) as cursor:
+            events = [dict(row) for row in await cursor.fetchall()]
+
+    _cache_user_event_rows(user_id, [dict(event) for event in events])
+    return events
+
+
+async def count_user_events(user_id: int, include_past: bool = False) -> int:
+    """Counts the events in a user's agenda."""
+    params = {"user_id": user_id, "now": None if include_past else int(time.time())}
+    async with _connect() as db:
+        async with db.execute(COUNT_USER_EVENTS_SQL, params) as cursor:
+            return (await cursor.fetchone())[0]
 
 
 async def get_user_past_events(user_id: int, limit: int = 50) -> List[Dict]:
     """Retrieves past events for a specific user (for stats and writeups)."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         async with db.execute("""
             SELECT e.*, ue.server_id
             FROM events e
             JOIN user_events ue ON e.id = ue.event_id
-            WHERE ue.user_id = ? AND e.end_time < datetime('now')
+            WHERE ue.user_id = ? AND e.end_time < ?
             ORDER BY e.end_time DESC
             LIMIT ?
-        """, (user_id, limit)) as cursor:
+        """, (user_id, int(time.time()), limit)) as cursor:
             rows = await cursor.fetchall()
             return [dict(row) for row in rows]
 
 
 async def get_event_by_name(event_name: str) -> Optional[Dict]:
     """Get event by its name."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         async with db.execute(
             "SELECT * FROM events WHERE event_name = ?", (event_name,)
         ) as cursor:
@@ -371,8 +629,7 @@ async def get_event_by_name(event_name: str) -> Optional[Dict]:
 
 async def get_event_by_id(event_id: int) -> Optional[Dict]:
     """Get event by its ID."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         async with db.execute(
             "SELECT * FROM events WHERE id = ?", (event_id,)
         ) as cursor:
@@ -382,31 +639,23 @@ async def get_event_by_id(event_id: int) -> Optional[Dict]:
 
 async def get_event_details(user_id: int, event_name: str) -> Optional[Dict]:
     """Retrieves details for a specific event for a specific user."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute("""
-            SELECT e.*, ue.reminder_sent, ue.good_luck_sent,
-                   ue.ending_soon_sent, ue.congratulations_sent, ue.server_id
-            FROM events e
-            JOIN user_events ue ON e.id = ue.event_id
-            WHERE ue.user_id = ? AND e.event_name = ?
-        """, (user_id, event_name)) as cursor:
+    cached = _user_events_cache.get(user_id)
+    if cached and time.monotonic() - cached[0] < USER_EVENTS_CACHE_TTL_SECONDS:
+        event = cached[1].get(event_name)
+        if event is not None:
+            return dict(event)
+
+    async with _connect() as db:
+        async with db.execute(GET_EVENT_DETAILS_SQL, (user_id, event_name)) as cursor:
             row = await cursor.fetchone()
             return dict(row) if row else None
 
 
 async def remove_event_from_user(user_id: int, event_name: str) -> bool:
     """Removes a specific event from a user's agenda (keeps event in events table)."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        event = await get_event_by_name(event_name)
-        if not event:
-            return False
-
-        cursor = await db.execute(
-            "DELETE FROM user_events WHERE user_id = ? AND event_id = ?",
-            (user_id, event["id"])
-        )
-        await db.commit()
+    async with _transaction() as db:
+        cursor = await db.execute(REMOVE_EVENT_FROM_USER_SQL, (user_id, event_name))
+        _invalidate_user_cache(user_id)
         deleted_count = cursor.rowcount
         if deleted_count > 0:
             logging.info(f"Event '{event_name}' removed from user {user_id}'s agenda.")
@@ -415,11 +664,9 @@ async def remove_event_from_user(user_id: int, event_name: str) -> bool:
 
 async def clear_user_events(user_id: int) -> int:
     """Removes all events from a specific user's agenda."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cursor = await db.execute(
-            "DELETE FROM user_events WHERE user_id = ?", (user_id,)
-        )
-        await db.commit()
+    async with _transaction() as db:
+        cursor = await db.execute(CLEAR_USER_EVENTS_SQL, (user_id,))
+        _invalidate_user_cache(user_id)
         deleted_count = cursor.rowcount
         logging.info(f"Cleared {deleted_count} events from user {user_id}'s agenda.")
         return deleted_count
@@ -427,13 +674,12 @@ async def clear_user_events(user_id: int) -> int:
 
 async def search_user_events(user_id: int, query: str) -> List[Dict]:
     """Search events in user's agenda by name or description."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         search_pattern = f"%{query}%"
         async with db.execute("""
             SELECT e.*, ue.server_id
-            FROM events e
-            JOIN user_events ue ON e.id = ue.event_id
+            FROM user_events ue INDEXED BY idx_user_events_user
+            CROSS JOIN events e ON e.id = ue.event_id
             WHERE ue.user_id = ? AND (
                 e.event_name LIKE ? OR
                 e.title LIKE ? OR
@@ -446,39 +692,81 @@ async def search_user_events(user_id: int, query: str) -> List[Dict]:
             return [dict(row) for row in rows]
 
 
+async def search_user_event_names(user_id: int, query: str, limit: int = 25) -> List[str]:
+    """Event names in user's agenda containing `query` (case-insensitive), for autocomplete."""
+    cache_key = (user_id, query.lower(), limit)
+    cached = _autocomplete_cache.get(cache_key)
+    if cached and time.monotonic() - cached[0] < AUTOCOMPLETE_CACHE_TTL_SECONDS:
+        return cached[1]
+
+    if not query:
+        # Initial focus: no filter needed, skip the LIKE and take the first rows by start time
+        sql = """
+            SELECT e.event_name
+            FROM user_events ue INDEXED BY idx_user_events_user
+            CROSS JOIN events e ON e.id = ue.event_id
+            WHERE ue.user_id = ?
+            ORDER BY e.start_time ASC
+            LIMIT ?
+        """
+        params = (user_id, limit)
+    else:
+        # Escape LIKE wildcards so the match stays a plain substring test
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        sql = """
+            SELECT e.event_name
+            FROM user_events ue INDEXED BY idx_user_events_user
+            CROSS JOIN events e ON e.id = ue.event_id
+            WHERE ue.user_id = ? AND e.event_name LIKE ? ESCAPE '\\'
+            ORDER BY e.start_time ASC
+            LIMIT ?
+        """
+        params = (user_id, f"%{escaped}%", limit)
+
+    async with _connect() as db:
+        async with db.execute(sql, params) as cursor:
+            names = [row[0] for row in await cursor.fetchall()]
+
+    now = time.monotonic()
+    if len(_autocomplete_cache) >= AUTOCOMPLETE_CACHE_MAX_ENTRIES:
+        for key in [key for key, (ts, _) in _autocomplete_cache.items()
+                    if now - ts >= AUTOCOMPLETE_CACHE_TTL_SECONDS]:
+            del _autocomplete_cache[key]
+    _autocomplete_cache[cache_key] = (now, names)
+    return names
+
+
 # =====================
 # EVENT MEMBERS (TEAMS)
 # =====================
 
 async def add_event_member(event_id: int, owner_user_id: int, member_user_id: int) -> bool:
     """Add a member to an event team."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        try:
+    try:
+        async with _transaction() as db:
             await db.execute("""
                 INSERT INTO event_members (event_id, owner_user_id, member_user_id)
                 VALUES (?, ?, ?)
             """, (event_id, owner_user_id, member_user_id))
-            await db.commit()
-            logging.info(f"Added member {member_user_id} to event {event_id} (owner: {owner_user_id})")
-            return True
-        except aiosqlite.IntegrityError:
-            return False
+    except aiosqlite.IntegrityError:
+        return False
+    logging.info(f"Added member {member_user_id} to event {event_id} (owner: {owner_user_id})")
+    return True
 
 
 async def remove_event_member(event_id: int, owner_user_id: int, member_user_id: int) -> bool:
     """Remove a member from an event team."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _transaction() as db:
         cursor = await db.execute("""
             DELETE FROM event_members
             WHERE event_id = ? AND owner_user_id = ? AND member_user_id = ?
         """, (event_id, owner_user_id, member_user_id))
-        await db.commit()
         return cursor.rowcount > 0
 
 
 async def get_event_members(event_id: int, owner_user_id: int) -> List[int]:
     """Get all members of an event team."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         async with db.execute("""
             SELECT member_user_id FROM event_members
             WHERE event_id = ? AND owner_user_id = ?
@@ -489,7 +777,7 @@ async def get_event_members(event_id: int, owner_user_id: int) -> List[int]:
 
 async def get_all_event_participants(event_id: int) -> List[int]:
     """Get all users participating in an event (owners + members)."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _connect() as db:
         # Get all users who have this event in their agenda
         async with db.execute("""
             SELECT DISTINCT user_id FROM user_events WHERE event_id = ?
@@ -520,20 +808,18 @@ async def add_writeup(
     notes: Optional[str] = None
 ) -> int:
     """Add a writeup for an event. Returns writeup ID."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _transaction() as db:
         cursor = await db.execute("""
             INSERT INTO writeups (event_id, user_id, url, title, challenge_name, category, notes)
             VALUES (?, ?, ?, ?, ?, ?, ?)
         """, (event_id, user_id, url, title, challenge_name, category, notes))
-        await db.commit()
         logging.info(f"Writeup added for event {event_id} by user {user_id}")
         return cursor.lastrowid
 
 
 async def get_event_writeups(event_id: int) -> List[Dict]:
     """Get all writeups for an event."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         async with db.execute("""
             SELECT * FROM writeups WHERE event_id = ?
             ORDER BY created_at DESC
@@ -544,8 +830,7 @@ async def get_event_writeups(event_id: int) -> List[Dict]:
 
 async def get_user_writeups(user_id: int, limit: int = 50) -> List[Dict]:
     """Get all writeups by a user."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _connect() as db:
         async with db.execute("""
             SELECT w.*, e.event_name, e.title as event_title
             FROM writeups w
@@ -560,12 +845,11 @@ async def get_user_writeups(user_id: int, limit: int = 50) -> List[Dict]:
 
 async def remove_writeup(writeup_id: int, user_id: int) -> bool:
     """Remove a writeup (only if user owns it)."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
+    async with _transaction() as db:
         cursor = await db.execute(
             "DELETE FROM writeups WHERE id = ? AND user_id = ?",
             (writeup_id, user_id)
         )
-        await db.commit()
         return cursor.rowcount > 0
 
 
@@ -573,52 +857,107 @@ async def remove_writeup(writeup_id: int, user_id: int) -> bool:
 # NOTIFICATIONS
 # =====================
 
-async def get_all_events_for_notifications() -> List[Dict]:
-    """Retrieves all active events from all users for notification processing."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        async with db.execute("""
-            SELECT e.*, ue.user_id, ue.reminder_sent, ue.good_luck_sent,
-                   ue.ending_soon_sent, ue.congratulations_sent,
-                   ue.channel_reminder_sent, ue.server_id,
-                   us.reminder_1h_before, us.good_luck_on_start,
-                   us.ending_soon_1h, us.congratulations_on_end,
-                   us.channel_notification
-            FROM events e
-            JOIN user_events ue ON e.id = ue.event_id
-            LEFT JOIN user_settings us ON ue.user_id = us.user_id
-            WHERE e.end_time >= datetime('now', '-1 day')
-            ORDER BY ue.user_id, e.start_time ASC
-        """) as cursor:
+# Notification windows, in seconds relative to the event start/end
+REMINDER_LEAD_SECONDS = 3600         # "starts in 1 hour" reminder (DM and channel)
+REMINDER_WINDOW_SECONDS = 300
+GOOD_LUCK_WINDOW_SECONDS = 120       # after start
+ENDING_SOON_LEAD_SECONDS = 3600      # "ends in 1 hour"
+ENDING_SOON_WINDOW_SECONDS = 300
+CONGRATULATIONS_WINDOW_SECONDS = 600  # after end
+
+# Only rows with at least one pending notification inside its window are returned. The outer
+# WHERE ranges are served by idx_events_start / idx_events_end; the due_* columns tell the
+# caller which notification(s) to send. A missing user_settings row yields NULL (not due).
+GET_DUE_NOTIFICATIONS_SQL = f"""
+    SELECT * FROM (
+        SELECT e.*, ue.user_id, ue.server_id,
+               (ue.server_id IS NOT NULL AND us.channel_notification AND NOT (ue.notification_flags & {FLAG_CHANNEL_REMINDER})
+                AND e.start_time > :reminder_after AND e.start_time <= :reminder_until) AS due_channel_reminder,
+               (us.reminder_1h_before AND NOT (ue.notification_flags & {FLAG_REMINDER})
+                AND e.start_time > :reminder_after AND e.start_time <= :reminder_until) AS due_reminder,
+               (us.good_luck_on_start AND NOT (ue.notification_flags & {FLAG_GOOD_LUCK})
+                AND e.start_time > :good_luck_after AND e.start_time <= :now) AS due_good_luck,
+               (us.ending_soon_1h AND NOT (ue.notification_flags & {FLAG_ENDING_SOON})
+                AND e.end_time > :ending_soon_after AND e.end_time <= :ending_soon_until) AS due_ending_soon,
+               (us.congratulations_on_end AND NOT (ue.notification_flags & {FLAG_CONGRATULATIONS})
+                AND e.end_time > :congratulations_after AND e.end_time <= :now) AS due_congratulations
+        FROM events e
+        JOIN user_events ue ON e.id = ue.event_id
+        LEFT JOIN user_settings us ON ue.user_id = us.user_id
+        WHERE (e.start_time > :good_luck_after AND e.start_time <= :reminder_until)
+           OR (e.end_time > :congratulations_after AND e.end_time <= :ending_soon_until)
+    )
+    WHERE due_channel_reminder OR due_reminder OR due_good_luck
+       OR due_ending_soon OR due_congratulations
+    ORDER BY user_id, start_time ASC
+"""
+
+
+# Earliest future instant at which any notification window opens; each branch is one
+# index seek, so this is cheap to run on idle ticks
+GET_NEXT_NOTIFICATION_TIME_SQL = """
+    SELECT MIN(t) FROM (
+        SELECT MIN(start_time) - :reminder_lead AS t FROM events WHERE start_time > :now + :reminder_lead
+        UNION ALL
+        SELECT MIN(start_time) FROM events WHERE start_time > :now
+        UNION ALL
+        SELECT MIN(end_time) - :ending_soon_lead FROM events WHERE end_time > :now + :ending_soon_lead
+        UNION ALL
+        SELECT MIN(end_time) FROM events WHERE end_time > :now
+    )
+"""
+
+
+async def get_next_notification_time(now: int) -> Optional[int]:
+    """Returns when the next notification window opens after `now`, or None if nothing is scheduled."""
+    params = {
+        "now": now,
+        "reminder_lead": REMINDER_LEAD_SECONDS,
+        "ending_soon_lead": ENDING_SOON_LEAD_SECONDS,
+    }
+    async with _connect() as db:
+        async with db.execute(GET_NEXT_NOTIFICATION_TIME_SQL, params) as cursor:
+            return (await cursor.fetchone())[0]
+
+
+async def get_due_notifications(now: int) -> List[Dict]:
+    """Retrieves user/event rows that have a notification due at `now` (unix epoch seconds)."""
+    params = {
+        "now": now,
+        "reminder_after": now + REMINDER_LEAD_SECONDS - REMINDER_WINDOW_SECONDS,
+        "reminder_until": now + REMINDER_LEAD_SECONDS,
+        "good_luck_after": now - GOOD_LUCK_WINDOW_SECONDS,
+        "ending_soon_after": now + ENDING_SOON_LEAD_SECONDS - ENDING_SOON_WINDOW_SECONDS,
+        "ending_soon_until": now + ENDING_SOON_LEAD_SECONDS,
+        "congratulations_after": now - CONGRATULATIONS_WINDOW_SECONDS,
+    }
+    async with _connect() as db:
+        async with db.execute(GET_DUE_NOTIFICATIONS_SQL, params) as cursor:
             return [dict(row) for row in await cursor.fetchall()]
 
 
-async def update_notification_flag(
-    user_id: int, event_name: str, flag_name: str, value: bool
-) -> bool:
-    """Updates a specific notification flag for an event."""
-    valid_flags = [
-        "reminder_sent",
-        "good_luck_sent",
-        "ending_soon_sent",
-        "congratulations_sent",
-        "channel_reminder_sent",
-    ]
-    if flag_name not in valid_flags:
-        raise ValueError(f"Invalid flag name: {flag_name}")
-
-    event = await get_event_by_name(event_name)
-    if not event:
-        return False
+async def mark_notifications_sent(updates: List[Tuple[int, int, int]]) -> int:
+    """Sets FLAG_* bits for many (user_id, event_id, flag) entries in one transaction."""
+    # OR all bits for the same row together so each row is updated once
+    by_row: Dict[Tuple[int, int], int] = {}
+    for user_id, event_id, flag in updates:
+        if not flag or flag & ~ALL_NOTIFICATION_FLAGS:
+            raise ValueError(f"Invalid notification flag: {flag}")
+        by_row[(user_id, event_id)] = by_row.get((user_id, event_id), 0) | flag
 
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        await db.execute(
-            f"UPDATE user_events SET {flag_name} = ? WHERE user_id = ? AND event_id = ?",
-            (int(value), user_id, event["id"])
+    if not by_row:
+        return 0
+
+    async with _transaction() as db:
+        await db.executemany(
+            "UPDATE user_events SET notification_flags = notification_flags | ? WHERE user_id = ? AND event_id = ?",
+            [(flags, user_id, event_id) for (user_id, event_id), flags in by_row.items()]
         )
-        await db.commit()
-        logging.debug(f"Updated flag '{flag_name}' to {value} for event '{event_name}', user {user_id}.")
-        return True
+
+    for user_id, _ in by_row:
+        _user_events_cache.pop(user_id, None)
+    logging.debug(f"Marked {len(updates)} notification flag(s) as sent.")
+    return len(by_row)
 
 
 # =====================
@@ -627,9 +966,8 @@ async def update_notification_flag(
 
 async def get_user_stats(user_id: int) -> Dict[str, Any]:
     """Get user statistics."""
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        db.row_factory = aiosqlite.Row
-
+    now = int(time.time())
+    async with _connect() as db:
         # Total events participated
         async with db.execute("""
             SELECT COUNT(*) as count FROM user_events WHERE user_id = ?
@@ -641,8 +979,8 @@ async def get_user_stats(user_id: int) -> Dict[str, Any]:
             SELECT COUNT(*) as count
             FROM user_events ue
             JOIN events e ON ue.event_id = e.id
-            WHERE ue.user_id = ? AND e.end_time < datetime('now')
-        """, (user_id,)) as cursor:
+            WHERE ue.user_id = ? AND e.end_time < ?
+        """, (user_id, now)) as cursor:
             past_events = (await cursor.fetchone())["count"]
 
         # Upcoming events
@@ -650,8 +988,8 @@ async def get_user_stats(user_id: int) -> Dict[str, Any]:
             SELECT COUNT(*) as count
             FROM user_events ue
             JOIN events e ON ue.event_id = e.id
-            WHERE ue.user_id = ? AND e.start_time > datetime('now')
-        """, (user_id,)) as cursor:
+            WHERE ue.user_id = ? AND e.start_time > ?
+        """, (user_id, now)) as cursor:
             upcoming_events = (await cursor.fetchone())["count"]
 
         # Total writeups
@@ -698,8 +1036,8 @@ async def cleanup_old_events(days_old: int = 365) -> int:
     """Remove events older than X days that have no writeups attached.
     Events with writeups are preserved indefinitely.
     """
-    async with aiosqlite.connect(DATABASE_PATH) as db:
-        cutoff_time = datetime.now(tz=__import__('pytz').utc) - timedelta(days=days_old)
+    async with _transaction() as db:
+        cutoff_time = int(time.time()) - days_old * 86400
 
         # Only delete events that:
         # 1. Ended more than X days ago
@@ -711,8 +1049,14 @@ async def cleanup_old_events(days_old: int = 365) -> int:
             AND id NOT IN (SELECT DISTINCT event_id FROM writeups)
             AND id NOT IN (SELECT DISTINCT event_id FROM user_events)
         """, (cutoff_time,))
-        await db.commit()
         deleted_count = cursor.rowcount
         if deleted_count > 0:
             logging.info(f"Cleaned up {deleted_count} old events from the database.")
         return deleted_count
+
+
+async def checkpoint_database():
+    """Refreshes planner statistics, then folds the WAL back into the main database file and truncates it."""
+    async with _transaction() as db:
+        await db.execute("PRAGMA optimize")
+        await db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
@@ -1,12 +1,15 @@
 # utils/helpers.py
 
-from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional, Union
 import html
 import pytz
 import uuid
 import re
 
+# Canonical "YYYY-MM-DD HH:MM" input format for user-entered date/times
+DATETIME_INPUT_FORMAT = "%Y-%m-%d %H:%M"
+
 # List of common timezones for autocomplete
 COMMON_TIMEZONES = [
     "Europe/Paris",
@@ -58,17 +61,24 @@ def format_discord_timestamp(dt: datetime, style: str = "F") -> str:
     Returns:
         A Discord timestamp string (e.g., '<t:1678886400:F>').
     """
+    # timestamp() of an aware datetime is already absolute; only naive values need a zone
     if dt.tzinfo is None:
-        dt = pytz.utc.localize(dt)
-    else:
-        dt = dt.astimezone(pytz.utc)
+        dt = dt.replace(tzinfo=timezone.utc)
     return f"<t:{int(dt.timestamp())}:{style}>"
 
 
+def format_discord_timestamp_from_epoch(ts: int, style: str = "F") -> str:
+    """Formats unix epoch seconds (as stored in the database) into a Discord timestamp string.
+
+    Accepts the same styles as `format_discord_timestamp`.
+    """
+    return f"<t:{ts}:{style}>"
+
+
 def format_datetime_local(dt: datetime, timezone_str: str = "Europe/Paris") -> str:
     """Format datetime in a specific timezone."""
     if dt.tzinfo is None:
-        dt = pytz.utc.localize(dt)
+        dt = dt.replace(tzinfo=timezone.utc)
 
     try:
         tz = pytz.timezone(timezone_str)
@@ -116,10 +126,10 @@ def parse_datetime_with_timezone(
 ) -> Optional[datetime]:
     """Parse date and time strings with a specific timezone, return UTC datetime."""
     try:
-        dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
+        dt = datetime.strptime(f"{date_str} {time_str}", DATETIME_INPUT_FORMAT)
         tz = pytz.timezone(timezone_str)
         local_dt = tz.localize(dt)
-        return local_dt.astimezone(pytz.utc)
+        return local_dt.astimezone(timezone.utc)
     except (ValueError, pytz.UnknownTimeZoneError):
         return None
 
@@ -147,21 +157,22 @@ def generate_ical(events: List[Dict]) -> str:
         start_time = event.get("start_time") or event.get("start")
         end_time = event.get("end_time") or event.get("finish")
 
-        if isinstance(start_time, str):
-            start_time = datetime.fromisoformat(start_time)
-        if isinstance(end_time, str):
-            end_time = datetime.fromisoformat(end_time)
+        # Database rows store unix epoch seconds
+        if isinstance(start_time, int):
+            start_time = datetime.fromtimestamp(start_time, tz=timezone.utc)
+        if isinstance(end_time, int):
+            end_time = datetime.fromtimestamp(end_time, tz=timezone.utc)
 
         # Ensure UTC
         if start_time.tzinfo is None:
-            start_time = pytz.utc.localize(start_time)
+            start_time = start_time.replace(tzinfo=timezone.utc)
         else:
-            start_time = start_time.astimezone(pytz.utc)
+            start_time = start_time.astimezone(timezone.utc)
 
         if end_time.tzinfo is None:
-            end_time = pytz.utc.localize(end_time)
+            end_time = end_time.replace(tzinfo=timezone.utc)
         else:
-            end_time = end_time.astimezone(pytz.utc)
+            end_time = end_time.astimezone(timezone.utc)
 
         # Format times for iCal (YYYYMMDDTHHmmssZ)
         start_str = start_time.strftime("%Y%m%dT%H%M%SZ")
@@ -192,7 +203,7 @@ def generate_ical(events: List[Dict]) -> str:
         lines.extend([
             "BEGIN:VEVENT",
             f"UID:{uid}",
-            f"DTSTAMP:{datetime.now(tz=pytz.utc).strftime('%Y%m%dT%H%M%SZ')}",
+            f"DTSTAMP:{datetime.now(tz=timezone.utc).strftime('%Y%m%dT%H%M%SZ')}",
             f"DTSTART:{start_str}",
             f"DTEND:{end_str}",
             f"SUMMARY:{_escape_ical_text(title)}",
@@ -245,15 +256,13 @@ def _escape_ical_text(text: str) -> str:
     return text
 
 
-def calculate_duration(start: datetime, end: datetime) -> str:
-    """Calculate and format duration between two datetimes."""
-    if isinstance(start, str):
-        start = datetime.fromisoformat(start)
-    if isinstance(end, str):
-        end = datetime.fromisoformat(end)
-
-    delta = end - start
-    total_hours = delta.total_seconds() / 3600
+def calculate_duration(start: Union[datetime, int], end: Union[datetime, int]) -> str:
+    """Calculate and format duration between two datetimes or unix epoch seconds."""
+    if isinstance(start, int) and isinstance(end, int):
+        total_seconds = end - start
+    else:
+        total_seconds = (end - start).total_seconds()
+    total_hours = total_seconds / 3600
 
     if total_hours < 24:
         return f"{int(total_hours)} hours"